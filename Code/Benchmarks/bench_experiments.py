@@ -0,0 +1,162 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - benchmark of the experiments of the report        ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Times the configurations behind the datasets (baseline, 50 ants, 50x50 arena and 25x4
+## food, each with and without pheromones, from sweep_experiments.py; the colony engine
+## with pheromones and one Ant object per ant without) on
+## one CPU core: the same fixed seeds every time, so every configuration simulates exactly
+## the same runs and only the time can change. Reports steps per second, replicates per
+## second (best of a few repeats) and the peak memory of one run (tracemalloc, measured in
+## a separate run because tracing slows the simulation down), and compares them with a
+## stored baseline file. Exits with status 1 when a configuration simulates fewer steps
+## per second or uses more memory than the baseline by more than the tolerance. Only when
+## the same runs were simulated as for the baseline (runs, seed and backend) are the
+## replicates per second compared as well, and a different number of steps then also
+## counts (the simulation itself changed): with other runs both depend on which runs they
+## are. Timings depend on the machine: store a new baseline (--save) before comparing
+## changes on another computer.
+## Run from this folder: python bench_experiments.py [--runs 10] [--tolerance 0.25] [--save]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Final models'))
+
+from antsim import run_replicate
+from antsim.replicates import replicate_seeds
+from sweep_experiments import baseline, experiments    # The configurations of the datasets
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_experiments_baseline.json')
+SEED = 2024                                                 # Master seed of the benchmark runs
+
+
+def benchmark_configs(backend='python'):
+    # {name: config} of every experiment with and without pheromones, from sweep_experiments.py
+    configs = {}
+    for name, changes in experiments.items():
+        for pheromones in (True, False):
+            key = f"{name} {'with' if pheromones else 'no'} pheromones"
+            configs[key] = baseline.replace(pheromones=pheromones, engine='colony' if pheromones else 'ants',
+                                            backend=backend, **changes)
+    return configs
+
+
+def time_config(config, runs, repeats):
+    # Total steps of the runs and the best time of repeats to simulate all of them
+    seeds = replicate_seeds(runs, SEED)
+    best = float('inf')
+    for _ in range(repeats):
+        start = timeit.default_timer()
+        total_steps = sum(run_replicate(config, seed)[0] for seed in seeds)
+        best = min(best, timeit.default_timer() - start)
+    return total_steps, best
+
+
+def peak_memory(config):
+    # Peak memory (MB) allocated during the first benchmark run, measured with tracemalloc
+    seed = replicate_seeds(1, SEED)[0]
+    tracemalloc.start()
+    try:
+        run_replicate(config, seed)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def run_benchmarks(runs=10, repeats=3, backend='python'):
+    results = {}
+    configs = benchmark_configs(backend)
+    if backend == 'numba':
+        run_replicate(next(iter(configs.values())), replicate_seeds(1, SEED)[0])   # Compile before timing
+    for name, config in configs.items():
+        total_steps, seconds = time_config(config, runs, repeats)
+        results[name] = {'total_steps': total_steps,
+                         'steps_per_second': total_steps / seconds,
+                         'replicates_per_second': runs / seconds,
+                         'peak_memory_mb': peak_memory(config)}
+        print(f"{name:<26}{total_steps:>10}{total_steps / seconds:>14.0f}{runs / seconds:>12.2f}{results[name]['peak_memory_mb']:>10.2f}",
+              flush=True)
+    return results
+
+
+def machine():
+    # Where the benchmark was run (a baseline is only meaningful on the same machine)
+    return {'machine': platform.machine(), 'processor': platform.processor(), 'system': platform.system(),
+            'python': platform.python_version(), 'numpy': np.__version__}
+
+
+def compare(results, stored, tolerance, same_runs=True):
+    """Names of the configurations that regressed against the stored results.
+
+    A configuration regressed when it simulates fewer steps per second or uses more memory
+    than stored, by more than tolerance. With same_runs (the same runs were simulated) it
+    also regressed when it does fewer replicates per second, or when its runs took another
+    number of steps, which means the simulation itself changed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in stored:
+            print(f"{name}: not in the baseline")
+            continue
+        old = stored[name]
+        changes = []
+        if same_runs and result['total_steps'] != old['total_steps']:
+            changes.append(f"total_steps {old['total_steps']} -> {result['total_steps']} (the runs themselves changed)")
+        # Replicates per second depend on which runs were simulated, steps per second hardly
+        for key in ('steps_per_second', 'replicates_per_second') if same_runs else ('steps_per_second',):
+            if result[key] < old[key] * (1 - tolerance):
+                changes.append(f"{key} {old[key]:.1f} -> {result[key]:.1f}")
+        if result['peak_memory_mb'] > old['peak_memory_mb'] * (1 + tolerance):
+            changes.append(f"peak_memory_mb {old['peak_memory_mb']:.2f} -> {result['peak_memory_mb']:.2f}")
+        if changes:
+            print(f"{name}: REGRESSION " + ', '.join(changes))
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the experiments of the report against a stored baseline")
+    parser.add_argument('--runs', type=int, default=10, help="replicates per configuration")
+    parser.add_argument('--repeats', type=int, default=3, help="times every configuration is timed, the best time counts")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown or memory increase")
+    parser.add_argument('--backend', default='python', choices=('python', 'numba'))
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline file to compare with (or to save)")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    print(f"{'configuration':<26}{'steps':>10}{'steps/s':>14}{'runs/s':>12}{'peak MB':>10}")
+    results = run_benchmarks(args.runs, args.repeats, args.backend)
+    settings = {'runs': args.runs, 'repeats': args.repeats, 'seed': SEED, 'backend': args.backend}
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump({'settings': settings, 'machine': machine(), 'results': results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline {args.baseline}, store one with --save")
+        return 0
+    with open(args.baseline) as file:
+        stored = json.load(file)
+    same_runs = all(stored['settings'].get(key) == settings[key] for key in ('runs', 'seed', 'backend'))
+    if not same_runs:
+        print(f"Baseline made with other runs {stored['settings']}, only the steps per second and memory are compared")
+    if stored['machine'] != machine():
+        print("Baseline made on another machine or software versions, timings may differ for that reason alone")
+    regressions = compare(results, stored['results'], args.tolerance, same_runs)
+    print(f"{len(regressions)} of {len(results)} configurations regressed (tolerance {args.tolerance:.0%})")
+    return int(bool(regressions))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
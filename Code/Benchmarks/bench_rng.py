@@ -0,0 +1,109 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - benchmark of the random number provider           ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Compares the cost of the random draws the ants make with Python's random module,
+## with a NumPy Generator called once per draw and with the block-buffered
+## RandomProvider, and the time per simulation step of both final models with each.
+## Run from this folder: python bench_rng.py
+
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Final models'))
+
+from antsim import Colony, SimulationConfig
+from antsim.model import Arena, Ant
+from antsim.rng import RandomProvider
+
+
+class PythonRandom:
+    # Same interface as RandomProvider, on top of Python's random module (the draws before RandomProvider)
+    def __init__(self, seed=None):
+        self.random_state = random.Random(seed)
+
+    def integers(self, high):
+        return self.random_state.randrange(high)
+
+    def choice(self, sequence):
+        return self.random_state.choice(sequence)
+
+    def weighted_choice(self, population, weights):
+        return self.random_state.choices(population, weights=weights, k=1)[0]
+
+
+class GeneratorPerCall(PythonRandom):
+    # Same interface, one call into a NumPy Generator per draw
+    def __init__(self, seed=None):
+        self.generator = np.random.default_rng(seed)
+
+    def integers(self, high):
+        return int(self.generator.integers(high))
+
+    def choice(self, sequence):
+        return sequence[int(self.generator.integers(len(sequence)))]
+
+    def weighted_choice(self, population, weights):
+        weights = np.asarray(weights, dtype=float)
+        return population[int(self.generator.choice(len(population), p=weights / weights.sum()))]
+
+
+def time_draws(number=100000):
+    # Microseconds per draw for the three kinds of draws made by the ants
+    moves = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+    weights = [0, 120.0, 0, 30.0, 0, 0, 55.0, 0]
+    print(f"{'draw (us per call)':<22}{'random':>10}{'Generator':>12}{'Provider':>12}")
+    sources = [PythonRandom(1), GeneratorPerCall(1), RandomProvider(1)]
+    for name, draw in [('choice', lambda source: source.choice(moves)),
+                       ('weighted_choice', lambda source: source.weighted_choice(moves, weights)),
+                       ('integers', lambda source: source.integers(19))]:
+        times = [timeit.timeit(lambda: draw(source), number=number) / number * 1e6 for source in sources]
+        print(f"{name:<22}" + ''.join(f"{t:>12.3f}" for t in times))
+
+
+def time_steps(name, config, steps=500, repeats=5):
+    # Microseconds per step of the per-ant model with every kind of random source
+    print(f"\n{name} (us per step, {config.ants} ants)")
+    for source in (PythonRandom, GeneratorPerCall, RandomProvider):
+        best = float('inf')
+        for repeat in range(repeats):
+            arena = Arena(config, rng=source(repeat))
+            ants_list = [Ant(arena) for _ in range(config.ants)]
+            start = timeit.default_timer()
+            for _ in range(steps):
+                for ant in ants_list:
+                    ant.move()
+                if arena.pheromones is not None:
+                    arena.update_pheromones()
+            best = min(best, timeit.default_timer() - start)
+        print(f"  {source.__name__:<20}{best / steps * 1e6:>10.1f}")
+
+
+def time_colony_steps(steps=500, repeats=5):
+    # Microseconds per step of the colony engine with a plain Generator and with RandomProvider
+    config = SimulationConfig()
+    print(f"\nColony engine (us per step, {config.ants} ants)")
+    for name, source in [('Generator', np.random.default_rng), ('RandomProvider', RandomProvider)]:
+        best = float('inf')
+        for repeat in range(repeats):
+            arena = Arena(config, rng=RandomProvider(repeat))
+            colony = Colony(arena, config.ants, config.pheromone_start, config.pheromone_min_detectable,
+                            rng=source(repeat))
+            start = timeit.default_timer()
+            for _ in range(steps):
+                colony.step()
+                arena.update_pheromones()
+            best = min(best, timeit.default_timer() - start)
+        print(f"  {name:<20}{best / steps * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    time_draws()
+    time_steps('no pheromones', SimulationConfig(pheromones=False))
+    time_steps('with pheromones', SimulationConfig())
+    time_colony_steps()
@@ -0,0 +1,185 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - exactness checks of the faster variants           ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Several faster variants of the model claim to give exactly the same numbers as the
+## simple version they replace, not only the same statistics. This script checks those
+## claims, so a change that breaks one is caught:
+##  - the diffusion kernel (deposit and deposit_path, also the shared kernel that is only
+##    built up to the depth of pheromone_start, with deposits above it) against the
+##    recursion of the original Ant.pheromone_diffusion, on random grids and paths
+##  - tile and lazy evaporation against dense evaporation: the same pheromone grid after
+##    every step of a run, and the same results of whole runs
+##  - ResultWriter against save_results: byte-identical .csv files, also after resuming
+##    from files that were cut off in the middle of a line
+##  - run_sweep against run_experiment with the same master seed
+##  - the per-ant model (engine='ants') against the step counts it gave for fixed seeds
+##    when it moved into antsim (the regression seeds of both models)
+## Exits with status 1 when a check fails.
+## Run from this folder: python check_exactness.py
+
+import filecmp
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Final models'))
+
+from antsim import Colony, DiffusionKernel, SimulationConfig, run_experiment, run_replicate, save_results
+from antsim.diffusion import diffusion_kernel
+from antsim.model import Arena
+from antsim.output import ResultWriter
+from antsim.replicates import seed_replicate
+from antsim.sweep import run_sweep
+
+# total_steps of run_replicate(config, seed) with engine='ants' for seeds 0 .. 4
+REGRESSION_SEEDS = {
+    'with pheromones': [1909, 1193, 2183, 2160, 2345],
+    'no pheromones': [5326, 4063, 3839, 3039, 4620],
+}
+
+
+def recursive_diffusion(grid, position, value, depth, diffusion_distance, pheromone_min_detectable, pheromone_max):
+    # Ant.pheromone_diffusion of the original model, on a plain grid
+    if value < pheromone_min_detectable or depth > diffusion_distance:
+        return
+    x, y = position
+    current = grid[x, y]
+    if current < pheromone_max:
+        grid[x, y] = min(current + max(current, value), pheromone_max)
+    half_value = value / 2
+    if half_value >= pheromone_min_detectable:
+        for direction_x in [-1, 0, 1]:
+            for direction_y in [-1, 0, 1]:
+                if direction_x == 0 and direction_y == 0:
+                    continue
+                new_x, new_y = x + direction_x, y + direction_y
+                if 0 <= new_x < grid.shape[0] and 0 <= new_y < grid.shape[1]:
+                    recursive_diffusion(grid, (new_x, new_y), half_value, depth + 1, diffusion_distance,
+                                        pheromone_min_detectable, pheromone_max)
+
+
+def check_diffusion(cases=300, size=12):
+    rng = np.random.default_rng(1)
+    failures = 0
+    for case in range(cases):
+        distance = int(rng.integers(1, 5))
+        pheromone_start = float(rng.choice([40, 100, 250]))
+        min_detectable, pheromone_max = 5.0 * int(rng.integers(1, 6)), 400.0
+        kernels = [DiffusionKernel(distance, min_detectable, pheromone_max),
+                   diffusion_kernel(distance, min_detectable, pheromone_max, pheromone_start)]
+        grid = rng.uniform(0, 300, (size, size)) * (rng.random((size, size)) < 0.3)
+        path = rng.integers(0, size, (int(rng.integers(1, 25)), 2))
+        values = pheromone_start * np.exp(-np.arange(len(path)) / len(path))    # As in leave_pheromone
+        if case % 3 == 0:
+            values *= 8                                     # Deeper than the shared kernel is built for
+        expected = grid.copy()
+        for position, value in zip(path, values):
+            recursive_diffusion(expected, tuple(position), value, 0, distance, min_detectable, pheromone_max)
+        for kernel in kernels:
+            one_by_one, whole_path = grid.copy(), grid.copy()
+            for position, value in zip(path, values):
+                kernel.deposit(one_by_one, position, value)
+            kernel.deposit_path(whole_path, path, values)
+            if not (np.array_equal(one_by_one, expected) and np.array_equal(whole_path, expected)):
+                failures += 1
+    print(f"diffusion kernel vs recursion: {failures} of {2 * cases} cases differ")
+    return failures == 0
+
+
+def check_evaporation(steps=1000):
+    failures = 0
+    for config in (SimulationConfig(), SimulationConfig(arena_size=50, ants=50)):
+        # The three modes side by side from the same seed, the grids compared after every step
+        runs = {}
+        for mode in ('dense', 'tiles', 'lazy'):
+            variant = config.replace(evaporation_mode=mode)
+            rng = seed_replicate(7)
+            arena = Arena(variant, rng=rng)
+            runs[mode] = (arena, Colony(arena, variant.ants, variant.pheromone_start, variant.pheromone_min_detectable, rng=rng))
+        same_grids = {'tiles': True, 'lazy': True}
+        had_pheromone = False
+        for _ in range(steps):
+            for arena, colony in runs.values():
+                colony.step()
+                arena.update_pheromones()
+            dense = runs['dense'][0].pheromone_levels()
+            had_pheromone |= bool(dense.any())
+            for mode in same_grids:
+                same_grids[mode] &= np.array_equal(runs[mode][0].pheromone_levels(), dense)
+        if not had_pheromone:
+            print(f"evaporation ({config.arena_size}x{config.arena_size}): no pheromone in {steps} steps, nothing compared")
+            failures += 1
+            continue
+        for mode, same in same_grids.items():
+            # Whole runs only when the grids match: with broken evaporation a run may never end
+            same_runs = same and all(run_replicate(config.replace(evaporation_mode=mode), seed) ==
+                                     run_replicate(config.replace(evaporation_mode='dense'), seed) for seed in range(3))
+            print(f"{mode} vs dense evaporation ({config.arena_size}x{config.arena_size}): "
+                  f"grids {'same' if same else 'DIFFER'}, runs {'same' if same_runs else 'DIFFER'}")
+            failures += not same_runs
+    return failures == 0
+
+
+def cut_last_line(path, keep=3):
+    # Simulate an interruption: keep a few bytes of the last line
+    with open(path, 'rb+') as file:
+        data = file.read()
+        last = data.rstrip(b'\r\n').rfind(b'\n') + 1
+        file.truncate(last + keep)
+
+
+def check_result_writer(folder):
+    results = run_experiment(SimulationConfig(), 6, 1, seed=11)
+    reference = [os.path.join(folder, name) for name in ('steps_reference.csv', 'food_reference.csv')]
+    save_results(results, *reference)
+    written = [os.path.join(folder, name) for name in ('steps.csv', 'food.csv')]
+    with ResultWriter(*written) as writer:
+        writer.write_all(results)
+    same = all(filecmp.cmp(a, b, shallow=False) for a, b in zip(written, reference))
+
+    resumed = [os.path.join(folder, name) for name in ('steps_resumed.csv', 'food_resumed.csv')]
+    with ResultWriter(*resumed) as writer:
+        writer.write_all(results[:4])
+    cut_last_line(resumed[0])                               # Run 4 is no longer finished
+    with open(resumed[1], 'ab') as file:
+        file.write(b'5,10')                                 # Half a food record of a run that never finished
+    with ResultWriter(*resumed, resume=True) as writer:
+        resume_from = writer.completed
+        writer.write_all(results[writer.completed:])
+    same_resumed = resume_from == 3 and all(filecmp.cmp(a, b, shallow=False) for a, b in zip(resumed, reference))
+    print(f"ResultWriter vs save_results: {'same' if same else 'DIFFER'}, "
+          f"after resuming from run {resume_from}: {'same' if same_resumed else 'DIFFER'}")
+    return same and same_resumed
+
+
+def check_sweep(folder, runs=4, seed=5):
+    configs = [SimulationConfig(), SimulationConfig(pheromones=False, engine='ants'), SimulationConfig(ants=50)]
+    swept = run_sweep(configs, runs, os.path.join(folder, 'checkpoint.jsonl'), workers=1, seed=seed)
+    same = all(swept[config] == run_experiment(config, runs, 1, seed) for config in configs)
+    print(f"run_sweep vs run_experiment: {'same' if same else 'DIFFER'}")
+    return same
+
+
+def check_regression_seeds():
+    ok = True
+    for name, expected in REGRESSION_SEEDS.items():
+        config = SimulationConfig(engine='ants', pheromones=name == 'with pheromones')
+        steps = [run_replicate(config, seed)[0] for seed in range(len(expected))]
+        print(f"per-ant model {name}: {steps} {'same' if steps == expected else 'DIFFER, expected ' + str(expected)}")
+        ok &= steps == expected
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        checks = [check_diffusion(), check_evaporation(), check_result_writer(folder), check_sweep(folder),
+                  check_regression_seeds()]
+    return int(not all(checks))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - parity check of the compiled backend              ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The compiled backend draws its random numbers differently, so single runs cannot be
+## compared with the Python model. Instead this runs the same number of replicates with
+## the original per-ant model (Ant.move for every ant), the Python backend and the numba
+## backend of antsim.run_replicate, and compares the distributions of the number of
+## steps until all food is gone with a two-sample Kolmogorov-Smirnov test.
+## Exits with status 1 when a distribution differs from the reference.
+## Run from this folder: python parity_compiled.py [runs]
+
+import math
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Final models'))
+
+from antsim import SimulationConfig, run_replicate
+from antsim.compiled import HAVE_NUMBA
+from antsim.model import Arena, Ant
+from antsim.replicates import replicate_seeds, seed_replicate
+
+config = SimulationConfig()                                 # Baseline experiment
+
+
+def reference_replicate(run, seed):
+    # One run of the original per-ant model: every ant moves in turn with Ant.move
+    arena = Arena(config, rng=seed_replicate(seed))
+    ants_list = [Ant(arena) for _ in range(config.ants)]
+    total_steps = 0
+    while arena.food_sources.remaining > 0:
+        for ant in ants_list:
+            ant.move()
+        arena.update_pheromones()
+        total_steps += 1
+    return total_steps
+
+
+def backend_replicate(backend):
+    # One run of run_replicate with the given backend
+    def replicate(run, seed):
+        return run_replicate(config.replace(backend=backend), seed)[0]
+    return replicate
+
+
+def ks_test(a, b):
+    # Two-sample Kolmogorov-Smirnov statistic and its asymptotic p-value
+    a, b = np.sort(a), np.sort(b)
+    values = np.concatenate((a, b))
+    distance = np.max(np.abs(np.searchsorted(a, values, side='right') / len(a) -
+                             np.searchsorted(b, values, side='right') / len(b)))
+    n = len(a) * len(b) / (len(a) + len(b))
+    x = (math.sqrt(n) + 0.12 + 0.11 / math.sqrt(n)) * distance
+    if x < 0.2:                                             # The series below converges too slowly here, p is 1 anyway
+        return distance, 1.0
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * x * x) for k in range(1, 101))
+    return distance, min(max(p_value, 0.0), 1.0)
+
+
+def main(runs=300, alpha=0.01):
+    if not HAVE_NUMBA:
+        print("numba is not installed, nothing to compare")
+        return 0
+    backend_replicate('numba')(0, np.random.SeedSequence(0))  # Compile the kernel before timing
+    samples = {}
+    for name, replicate, seed in [('reference', reference_replicate, 1),
+                                  ('python', backend_replicate('python'), 2),
+                                  ('numba', backend_replicate('numba'), 3)]:
+        start = timeit.default_timer()
+        samples[name] = np.array([replicate(run, s) for run, s in enumerate(replicate_seeds(runs, seed))])
+        elapsed = timeit.default_timer() - start
+        steps = samples[name]
+        print(f"{name:<10} mean {steps.mean():8.1f}  sd {steps.std(ddof=1):7.1f}  "
+              f"median {np.median(steps):7.1f}  ({elapsed / runs * 1000:.1f} ms per run)")
+
+    failed = False
+    for name in ('python', 'numba'):
+        distance, p_value = ks_test(samples['reference'], samples[name])
+        print(f"{name} vs reference: KS D = {distance:.3f}, p = {p_value:.3f}")
+        failed |= p_value < alpha
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
@@ -0,0 +1,27 @@
+## Shared simulation code for the ant foraging models in this folder.
+##
+## Besides the model itself (config, model, colony, trails, diffusion, pheromones) and
+## running it (experiment, replicates, batch, compiled, sweep):
+##  - adaptive: replicates in batches until the confidence interval of the mean number of
+##    steps is narrow enough (target_ci_width in the model scripts)
+##  - output: ResultWriter writes every run to the .csv files as soon as it is finished
+##    (resume = True continues an interrupted experiment)
+##  - columnar: the food tracking as integer columns in a .npz file (columnar = True;
+##    compress_columns = False stores them uncompressed, so they are memory-mapped)
+##  - metrics: probes sampled during a run, each with its own interval, e.g.
+##    run_replicate(config, seed, Metrics(AntsCarrying(10), TrailCoverage(50)))
+##  - render: animation frames drawn with matplotlib and blitting, or rasterised straight
+##    from the arrays (rasterised_animation = True)
+##  - trace: every run recorded as a compact trace (trace_dir) to animate it afterwards,
+##    e.g. render_trace('traces/run_0001.npz', 'run1.gif')
+##  - trajectory: positions and states of every ant at every step in one memory-mapped
+##    binary file (trajectory_file), read with TrajectoryFile
+##  - profiling: time per phase of every run (profile_file), read_profile adds them up
+
+from .colony import Colony, AntView
+from .diffusion import DiffusionKernel
+from .rng import RandomProvider
+from .pheromones import DenseEvaporation, TileEvaporation, LazyEvaporation, make_evaporation
+from .neighbours import pheromone_choice
+from .config import SimulationConfig
+from .experiment import run_replicate, run_experiment, iter_experiment, save_results
@@ -0,0 +1,136 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - adaptive number of replicates                     ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Instead of a fixed number of runs, replicates are launched in batches until the mean
+## total_steps is known precisely enough: until the confidence interval of the mean is
+## narrower than ci_width, or, when two configurations are compared (e.g. with and
+## without pheromones), until the confidence interval of the difference of their means
+## is. Mean and variance are kept up to date run by run (Welford's algorithm), so the
+## stopping rule needs no list of all results. max_runs caps the number of runs. Run r
+## gets the same seed as in run_experiment, so the runs are the first runs of a fixed
+## experiment with the same master seed. In a comparison run r of both configurations
+## gets the same seed (and so the same food layout), so the runs come in pairs and the
+## interval is that of the mean of the paired differences. All batches run in one pool of
+## worker processes, started once, so small batches do not pay for starting the workers.
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from statistics import NormalDist
+
+from .experiment import iter_experiment
+
+
+class RunningStats:
+    """Mean and variance of a stream of values, updated one value at a time (Welford)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0                                       # Sum of squared differences from the current mean
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        # Sample variance (nan with fewer than 2 values)
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def standard_error(self):
+        return math.sqrt(self.variance / self.count) if self.count > 1 else math.nan
+
+    def ci_width(self, confidence=0.95):
+        # Width of the normal confidence interval of the mean
+        return 2 * _z(confidence) * self.standard_error
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def _batch_size(batch_runs, workers):
+    # Default batch: a few runs for every worker, so the pool is kept busy
+    if batch_runs is not None:
+        return batch_runs
+    return 4 * (workers or os.cpu_count() or 1)
+
+
+def _worker_pool(workers):
+    # One pool for all batches (nothing to start when the runs stay in the current process)
+    workers = os.cpu_count() or 1 if workers is None else workers
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+
+
+def iter_adaptive(config, ci_width, max_runs=1000, min_runs=30, batch_runs=None, confidence=0.95,
+                  workers=None, seed=None, stats=None, first_run=0, trace_dir=None, trajectory_file=None,
+                  profile_file=None):
+    """Yield (total_steps, food_left) in run order until the mean total_steps is precise enough.
+
+    Runs are launched batch_runs at a time (None = 4 per worker). After every batch, and
+    from min_runs runs on, the experiment stops when the confidence interval of the mean
+    total_steps is at most ci_width steps wide, or when max_runs runs are done.
+    stats: a RunningStats to fill, to read the mean and interval afterwards.
+    first_run continues an experiment of which the first_run runs are already in stats.
+    trace_dir, trajectory_file, profile_file: store the trace, trajectory or profile of every
+    run (see iter_experiment).
+    """
+    stats = RunningStats() if stats is None else stats
+    batch_runs = _batch_size(batch_runs, workers)
+    done = first_run
+    if done >= min_runs and stats.ci_width(confidence) <= ci_width:
+        return                                              # Already precise enough
+    with _worker_pool(workers) as executor:
+        while done < max_runs:
+            runs = min(batch_runs, max_runs - done)
+            for result in iter_experiment(config, runs, workers, seed, first_run=done, trace_dir=trace_dir,
+                                          trajectory_file=trajectory_file, profile_file=profile_file, executor=executor):
+                stats.add(result[0])
+                yield result
+            done += runs
+            if done >= min_runs and stats.ci_width(confidence) <= ci_width:
+                return
+
+
+def run_adaptive(config, ci_width, max_runs=1000, min_runs=30, batch_runs=None, confidence=0.95,
+                 workers=None, seed=None):
+    # Same as iter_adaptive, returns (results, stats)
+    stats = RunningStats()
+    results = list(iter_adaptive(config, ci_width, max_runs, min_runs, batch_runs, confidence, workers, seed, stats))
+    return results, stats
+
+
+def run_adaptive_comparison(config, other, ci_width, max_runs=1000, min_runs=30, batch_runs=None,
+                            confidence=0.95, workers=None, seed=None):
+    """Run two configurations side by side until the difference of their mean total_steps is precise enough.
+
+    Both get a batch of runs at a time until the confidence interval of
+    mean(config) - mean(other) is at most ci_width steps wide, or max_runs runs are done.
+    Run r of both uses the same seed, so the interval is the paired one: that of the mean
+    of the differences total_steps(config) - total_steps(other) per run.
+    Returns (results, other_results, stats, other_stats, difference_stats).
+    """
+    stats, other_stats, difference_stats = RunningStats(), RunningStats(), RunningStats()
+    results, other_results = [], []
+    batch_runs = _batch_size(batch_runs, workers)
+    done = 0
+    with _worker_pool(workers) as executor:
+        while done < max_runs:
+            runs = min(batch_runs, max_runs - done)
+            for config_, stats_, results_ in ((config, stats, results), (other, other_stats, other_results)):
+                for result in iter_experiment(config_, runs, workers, seed, first_run=done, executor=executor):
+                    stats_.add(result[0])
+                    results_.append(result)
+            for result, other_result in zip(results[done:], other_results[done:]):
+                difference_stats.add(result[0] - other_result[0])
+            done += runs
+            if done >= min_runs and difference_stats.ci_width(confidence) <= ci_width:
+                break
+    return results, other_results, stats, other_stats, difference_stats
@@ -0,0 +1,224 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - batch of replicates                               ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## On the 20x20 baseline a step of one arena is only a few hundred cells and ten ants,
+## so most of the time goes to Python and NumPy call overhead, not to arithmetic.
+## ReplicateBatch keeps R independent replicates of the model as stacked arrays: a
+## (R, N + 2, N + 2) padded pheromone tensor (not allocated without pheromones), a
+## (R, N, N) food tensor and (R, ants) ant arrays, and advances all of them in lockstep
+## with the same batched rules as Colony.step (searching ants move first, then returning
+## ants deposit in ant order), so it needs engine='colony' and backend='python'. The
+## stacked grids are always evaporated as a whole: config.evaporation_mode is not used,
+## the tile and lazy modes would give the same levels.
+## A replicate is retired from the batch as soon as its food is gone, so the remaining
+## ones do not carry it along. Every batch draws from its own random stream, so results
+## are reproducible for a given seed and batch size, but differ from the runs of
+## run_replicate with the same seed (the step statistics are the same).
+
+from functools import partial
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .config import SimulationConfig
+from .diffusion import diffusion_kernel
+from .neighbours import pheromone_choice
+from .replicates import iter_replicates
+from .rng import RandomProvider
+from .tables import MOVES, home_directions, move_table
+
+
+class ReplicateBatch:
+    """R replicates of the model, stored as stacked arrays and stepped together."""
+
+    def __init__(self, replicates, config=None, rng=None):
+        self.config = config = SimulationConfig() if config is None else config  # Same parameters for every replicate
+        arena_size = config.arena_size
+        self.arena_size = arena_size
+        self.pheromone_start = config.pheromone_start      # Level of pheromone when just deposited
+        self.pheromone_min_detectable = config.pheromone_min_detectable    # Below this value the ants can no longer detect the pheromone
+        self.evaporation_rate = config.evaporation_rate    # Pheromone evaporation rate per step
+        self.rng = RandomProvider() if rng is None else rng # Random numbers for all replicates of the batch
+
+        # Colony in the middle of the arena, same layout as Arena.init_colony
+        middle = arena_size // 2
+        col_start = middle - config.colony_size // 2
+        self.colony_area = [(x, y) for x in range(col_start, col_start + config.colony_size)
+                            for y in range(col_start, col_start + config.colony_size)]
+        self.colony_cells = np.array(self.colony_area)
+        self.in_colony = np.zeros((arena_size, arena_size), dtype=bool)
+        self.in_colony[self.colony_cells[:, 0], self.colony_cells[:, 1]] = True
+        self.home_direction = home_directions(arena_size, tuple(self.colony_area))
+        self.move_table, self.move_counts = move_table(arena_size)
+        self.diffusion_kernel = diffusion_kernel(config.diffusion_distance, config.pheromone_min_detectable, config.pheromone_max,
+                                                 config.pheromone_start)
+
+        # Replicate state: one layer per replicate that is still running
+        self.replicates = np.arange(replicates)             # Replicate number of every layer
+        self.padded_pheromones = (np.zeros((replicates, arena_size + 2, arena_size + 2))   # Pheromone grids with a border of zeros
+                                  if config.pheromones else None)  # (None = model without pheromones)
+        self.food = np.zeros((replicates, arena_size, arena_size), dtype=np.int64)
+        for layer in range(replicates):
+            self.place_food(layer, config.food_sources, config.food_value)
+        self.remaining = self.food.sum(axis=(1, 2))         # Food left per replicate
+
+        # Ant state: one row per replicate, one column per ant
+        ants = config.ants
+        self.positions = self.colony_cells[self.rng.integers(len(self.colony_cells), size=replicates * ants)].reshape(replicates, ants, 2)
+        self.has_food = np.zeros((replicates, ants), dtype=bool)
+        self.paths = np.zeros((replicates, ants, arena_size + 1, 2), dtype=np.int64)  # A homing trip is never longer than the arena
+        self.path_lengths = np.zeros((replicates, ants), dtype=np.int64)
+
+    def place_food(self, layer, food_sources, food_value):
+        # Same rule as Arena.init_food_sources: not on the last row or column, not in the colony, not on another source
+        placed = 0
+        while placed < food_sources:
+            x = self.rng.integers(self.arena_size - 1)
+            y = self.rng.integers(self.arena_size - 1)
+            if not self.in_colony[x, y] and self.food[layer, x, y] == 0:
+                self.food[layer, x, y] = food_value
+                placed += 1
+
+    @property
+    def pheromones(self):                                   # Pheromone grids of the running replicates (view on the inside of the padded tensor)
+        return self.padded_pheromones[:, 1:-1, 1:-1]
+
+    def __len__(self):                                      # Number of replicates still running
+        return len(self.replicates)
+
+    def step(self):
+        # Move all ants of all running replicates by one step and evaporate the pheromone
+        searching = np.nonzero(~self.has_food)
+        returning = np.nonzero(self.has_food)
+        if len(searching[0]):
+            self.search_for_food(*searching)
+        if len(returning[0]):
+            self.return_to_colony(*returning)
+        if self.padded_pheromones is not None:
+            grid = self.pheromones
+            grid *= (1 - self.evaporation_rate)
+            grid[grid < self.pheromone_min_detectable] = 0
+
+    def search_for_food(self, layers, ants):
+        positions = self.positions[layers, ants]
+        x, y = positions[:, 0], positions[:, 1]
+        if self.padded_pheromones is None:
+            follow = np.zeros(len(layers), dtype=bool)     # Model without pheromones: everyone walks randomly
+        else:
+            follow = self.pheromones[layers, x, y] >= self.pheromone_min_detectable
+        choice = np.empty(len(layers), dtype=np.int64)
+        walk = ~follow
+        if follow.any():
+            # 3x3 windows of the padded grids: zero outside the arena, so those moves are never chosen
+            windows = sliding_window_view(self.padded_pheromones, (3, 3), axis=(1, 2))[layers[follow], x[follow], y[follow]]
+            choice[follow], has_pheromone = pheromone_choice(windows, self.rng.random(follow.sum()))
+            walk[follow] = ~has_pheromone                   # No pheromone around: all valid moves equally likely
+        if walk.any():
+            choice[walk] = self.move_table[x[walk], y[walk], self.rng.integers(self.move_counts[x[walk], y[walk]])]
+        positions = positions + MOVES[choice]
+        self.positions[layers, ants] = positions
+        self.pick_up_food(layers, ants, positions)
+
+    def pick_up_food(self, layers, ants, positions):
+        # Ants on a cell with food take one unit each, in ant order while the food lasts
+        x, y = positions[:, 0], positions[:, 1]
+        on_food = self.food[layers, x, y] > 0
+        if not on_food.any():
+            return
+        layers, ants, x, y = layers[on_food], ants[on_food], x[on_food], y[on_food]
+        cells = (layers * self.arena_size + x) * self.arena_size + y
+        order = np.argsort(cells, kind='stable')            # Ants are in (layer, ant) order, the stable sort keeps it per cell
+        sorted_cells = cells[order]
+        index = np.arange(len(order))
+        group_start = np.maximum.accumulate(np.where(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]], index, 0))
+        rank = np.empty_like(index)
+        rank[order] = index - group_start                   # Number of ants before this one on the same cell
+        takes = rank < self.food[layers, x, y]
+        layers, ants, x, y = layers[takes], ants[takes], x[takes], y[takes]
+        np.subtract.at(self.food, (layers, x, y), 1)
+        np.subtract.at(self.remaining, layers, 1)
+        self.has_food[layers, ants] = True
+        self.paths[layers, ants, 0] = np.stack((x, y), axis=1)  # Start recording the path at the food source
+        self.path_lengths[layers, ants] = 1
+
+    def return_to_colony(self, layers, ants):
+        positions = self.positions[layers, ants]
+        positions = positions + self.home_direction[positions[:, 0], positions[:, 1]]
+        self.positions[layers, ants] = positions
+        self.paths[layers, ants, self.path_lengths[layers, ants]] = positions
+        self.path_lengths[layers, ants] += 1
+        if self.padded_pheromones is not None:
+            self.leave_pheromone(layers, ants)
+
+        arrived = self.in_colony[positions[:, 0], positions[:, 1]]
+        if arrived.any():
+            layers, ants = layers[arrived], ants[arrived]
+            self.has_food[layers, ants] = False
+            self.path_lengths[layers, ants] = 0
+            self.positions[layers, ants] = self.colony_cells[self.rng.integers(len(self.colony_cells), size=len(layers))]
+
+    def leave_pheromone(self, layers, ants):
+        # Deposit along the paths of all returning ants at once, ant after ant like Colony.leave_pheromone
+        lengths = self.path_lengths[layers, ants]
+        owner = np.repeat(np.arange(len(layers)), lengths)
+        step = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)     # Position along the path
+        values = self.pheromone_start * np.exp(-step / lengths[owner])
+        positions = self.paths[layers[owner], ants[owner], step]
+        self.diffusion_kernel.deposit_path(self.pheromones, positions, values, layers=layers[owner])
+
+    def retire(self, finished):
+        # Drop the layers of finished replicates from all arrays
+        running = ~finished
+        self.replicates = self.replicates[running]
+        if self.padded_pheromones is not None:
+            self.padded_pheromones = self.padded_pheromones[running]
+        self.food = self.food[running]
+        self.remaining = self.remaining[running]
+        self.positions = self.positions[running]
+        self.has_food = self.has_food[running]
+        self.paths = self.paths[running]
+        self.path_lengths = self.path_lengths[running]
+
+    def run(self):
+        """Step until the food of every replicate is gone.
+
+        Returns one (total_steps, food_left) per replicate, in replicate order, with
+        food_left in the same format as antsim.experiment.run_replicate.
+        """
+        track_every = self.config.track_every
+        results = [None] * len(self)
+        food_left = [[] for _ in range(len(self))]
+        total_steps = 0
+        while len(self):
+            self.step()
+            total_steps += 1
+            if total_steps % track_every == 0:
+                for replicate, remaining in zip(self.replicates, self.remaining):
+                    food_left[replicate].append({'steps': total_steps, 'remaining_food': int(remaining)})
+            finished = self.remaining == 0
+            if finished.any():
+                for replicate in self.replicates[finished]:
+                    food_left[replicate].append({'steps': total_steps, 'remaining_food': 0})
+                    results[replicate] = (total_steps, food_left[replicate])
+                self.retire(finished)
+        return results
+
+
+def run_batch(config, runs, batch_size, index, seed):
+    # Replicates index * batch_size ... of an experiment of runs replicates, as one batch (module level for the worker processes)
+    replicates = min(batch_size, runs - index * batch_size)
+    return ReplicateBatch(replicates, config, rng=RandomProvider(seed)).run()
+
+
+def iter_batched_replicates(config, runs, batch_size, workers=None, seed=None):
+    """Yield (total_steps, food_left) for every run, in run order, simulating batch_size runs at a time.
+
+    The batches are spread over the worker processes like the runs in iter_replicates,
+    with one random stream per batch.
+    """
+    batches = -(-runs // batch_size)
+    replicate = partial(run_batch, config, runs, batch_size)
+    for results in iter_replicates(replicate, batches, workers, seed):
+        yield from results
@@ -0,0 +1,178 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - vectorised colony engine                          ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The per-ant model in model.py (Arena and Ant) keeps one Python object per ant and
+## moves them one by one. Here the whole colony is stored as NumPy arrays (positions,
+## carrying state and the recorded homing paths) and advanced in one batched step.
+## The rules are the same as in Ant.move:
+##  - searching ants follow the pheromone when the level on their cell is detectable,
+##    otherwise they do a random walk, and pick up food when they land on a food source
+##  - ants carrying food step towards the closest colony cell, record their path,
+##    deposit pheromone along it and start a new trip from the colony when they arrive
+## (in the model without pheromones, arena.pheromones is None and both pheromone parts
+## are skipped)
+## In a batched step all searching ants move first and read the pheromone grid as it was
+## at the start of the step, then all returning ants deposit. Ant.move interleaves the
+## two in ant order, so single runs differ but the step statistics are the same.
+## Moving ants one at a time through the Ant views (ant.move()) gives the exact
+## ant-by-ant order of the original model.
+
+import numpy as np
+
+from .rng import RandomProvider
+from .neighbours import pheromone_choice
+from .tables import MOVES, move_table
+
+class Colony:
+    """All foraging ants of one arena, stored as arrays and moved together."""
+
+    def __init__(self, arena, ants, pheromone_start=100, pheromone_min_detectable=25, rng=None):
+        self.arena = arena                                  # Reference to the arena (pheromone levels and deposition, food sources, colony area)
+        self.pheromone_start = pheromone_start              # Level of pheromone when just deposited
+        self.pheromone_min_detectable = pheromone_min_detectable    # Below this value the ants can no longer detect the pheromone
+        self.rng = RandomProvider() if rng is None else rng # Random numbers for all ant decisions (a NumPy Generator works too)
+
+        size = arena.arena_size
+        self.colony_cells = np.array(arena.colony_area)     # Colony coordinates as an (n_cells, 2) array, same order as arena.colony_area
+        self.in_colony = arena.in_colony                    # Boolean mask of the colony area
+        self.move_table, self.move_counts = move_table(size)    # Valid moves from every cell
+
+        # Ant state: one row per ant
+        self.positions = self.random_start_positions(ants)  # Current (x, y) position of every ant
+        self.has_food = np.zeros(ants, dtype=bool)          # Whether every ant is carrying food
+        # A homing trip only moves closer to the colony, so it is never longer than the arena
+        self.paths = np.zeros((ants, size + 1, 2), dtype=np.int64)   # Recorded path of every ant (food source first)
+        self.path_lengths = np.zeros(ants, dtype=np.int64)  # Number of recorded positions per ant
+
+        self.ants = [AntView(self, i) for i in range(ants)] # Object view on every ant
+
+    def __len__(self):
+        return len(self.positions)
+
+    def random_start_positions(self, n):                   # Start from random points within the colony area
+        return self.colony_cells[self.rng.integers(len(self.colony_cells), size=n)].copy()
+
+    def step(self, index=None):
+        # Move all ants (or only the ants in index) by one step
+        if index is None:
+            index = np.arange(len(self))
+        index = np.asarray(index, dtype=np.int64)
+        searching = index[~self.has_food[index]]
+        returning = index[self.has_food[index]]
+        if len(searching):
+            self.search_for_food(searching)
+        if len(returning):
+            self.return_to_colony(returning)
+
+    def search_for_food(self, index):
+        # Ants on a detectable pheromone level follow the trail, the others walk randomly
+        if self.arena.pheromones is None:                   # Model without pheromones: everyone walks randomly
+            self.random_walk(index)
+            self.pick_up_food(index)
+            return
+        positions = self.positions[index]
+        pheromone_values = self.arena.pheromone_values(positions[:, 0], positions[:, 1])
+        follow = pheromone_values >= self.pheromone_min_detectable
+        if follow.any():
+            self.follow_pheromones(index[follow])
+        if not follow.all():
+            self.random_walk(index[~follow])
+        self.pick_up_food(index)
+
+    def pick_up_food(self, index):
+        # Check, in ant order, which ants landed on a food source that still has food
+        food_sources = self.arena.food_sources
+        positions = self.positions[index]
+        on_food = index[food_sources.grid[positions[:, 0], positions[:, 1]] > 0]
+        for i in on_food:                                   # Ants sharing the last food of a source are served in ant order
+            if food_sources.take(self.positions[i]):        # Decrease food value by 1
+                self.has_food[i] = True                     # Ant is now carrying food
+                self.paths[i, 0] = self.positions[i]        # Start recording path to leave the pheromones
+                self.path_lengths[i] = 1
+
+    def random_walk(self, index):
+        # Every ant picks one of the moves that stay inside the arena, with a single draw
+        positions = self.positions[index]
+        x, y = positions[:, 0], positions[:, 1]
+        choice = self.rng.integers(self.move_counts[x, y])          # Uniform in range(number of valid moves) per ant
+        self.positions[index] = positions + MOVES[self.move_table[x, y, choice]]
+
+    def follow_pheromones(self, index):
+        # Every ant moves to an adjacent cell with a probability proportional to its pheromone level,
+        # read from the 3x3 pheromone windows around the ants
+        positions = self.positions[index]
+        x, y = positions[:, 0], positions[:, 1]
+        windows = self.arena.pheromone_neighbourhoods(x, y)
+        choice, has_pheromone = pheromone_choice(windows, self.rng.random(len(index)))
+        # If no adjacent position has pheromone, all valid positions get the same probability (as in the random walk)
+        if not has_pheromone.all():
+            none = ~has_pheromone
+            choice[none] = self.move_table[x[none], y[none], self.rng.integers(self.move_counts[x[none], y[none]])]
+        self.positions[index] = positions + MOVES[choice]
+
+    def return_to_colony(self, index):
+        # Step towards the closest colony cell, looked up in the arena's precomputed direction field
+        positions = self.positions[index]
+        positions = positions + self.arena.home_direction[positions[:, 0], positions[:, 1]]
+        self.positions[index] = positions
+
+        # Record the new position and deposit pheromone along the paths, in ant order
+        self.paths[index, self.path_lengths[index]] = positions
+        self.path_lengths[index] += 1
+        if self.arena.pheromones is not None:
+            self.leave_pheromone(index)
+
+        # Ants that reached the colony drop their food and start a new trip
+        arrived = index[self.in_colony[positions[:, 0], positions[:, 1]]]
+        if len(arrived):
+            self.has_food[arrived] = False
+            self.path_lengths[arrived] = 0
+            self.positions[arrived] = self.random_start_positions(len(arrived))
+
+    def leave_pheromone(self, index):
+        # Deposit pheromone along the paths of the ants in index, decreasing exponentially from the food source
+        # The paths are joined in ant order and deposited with one call, same as one path after the other (see DiffusionKernel.deposit_path)
+        lengths = self.path_lengths[index]
+        owner = np.repeat(np.arange(len(index)), lengths)   # Ant (in index) of every position
+        step = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)     # Position along the path
+        pheromone_values = self.pheromone_start * np.exp(-step / lengths[owner])
+        self.arena.deposit_trail(self.paths[index[owner], step], pheromone_values)    # The arena diffuses the pheromone and keeps track of where it is
+
+
+class AntView:
+    """Ant object backed by one row of the colony arrays."""
+
+    def __init__(self, colony, index):
+        self.colony = colony
+        self.index = index
+
+    @property
+    def arena(self):
+        return self.colony.arena
+
+    @property
+    def position(self):
+        x, y = self.colony.positions[self.index]
+        return (int(x), int(y))
+
+    @position.setter
+    def position(self, position):
+        self.colony.positions[self.index] = position
+
+    @property
+    def has_food(self):
+        return bool(self.colony.has_food[self.index])
+
+    @has_food.setter
+    def has_food(self, has_food):
+        self.colony.has_food[self.index] = has_food
+
+    @property
+    def path(self):
+        length = self.colony.path_lengths[self.index]
+        return [(int(x), int(y)) for x, y in self.colony.paths[self.index, :length]]
+
+    def move(self):                                         # Move only this ant, like Ant.move
+        self.colony.step([self.index])
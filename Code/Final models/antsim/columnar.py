@@ -0,0 +1,98 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - food tracking as binary columns                   ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The food tracking of a large experiment is a long table (the 50x50 files have over
+## 200 000 rows) of three integer columns: run, after_nr_steps and remaining_food. As
+## text every value has to be formatted and parsed again. Here the columns are stored as
+## NumPy arrays in one .npz file, each with the smallest unsigned integer type that holds
+## its values (remaining_food usually fits in one byte). compress=True (default) deflates
+## the file, which is smallest on disk; with compress=False the columns are stored as they
+## are and load_food_columns memory-maps them, so only the parts that are used are read.
+## The .csv schema stays available: columns_to_csv writes the same file as save_results,
+## for the R scripts, and csv_to_columns converts existing .csv files. The model scripts
+## write the columns while the runs finish (ResultWriter with columns_file, see output.py).
+
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+
+FOOD_COLUMNS = ('run', 'after_nr_steps', 'remaining_food')
+
+
+def _smallest_uint(values):
+    # values as the smallest unsigned integer type that can hold all of them
+    values = np.asarray(values)
+    top = int(values.max()) if values.size else 0
+    return values.astype(np.min_scalar_type(top))
+
+
+def food_columns(results):
+    # {column: array} of the food tracking of a list of (total_steps, food_left), runs numbered from 1
+    counts = [len(food_left) for _, food_left in results]
+    run = np.repeat(np.arange(1, len(results) + 1), counts)
+    steps = np.fromiter((record['steps'] for _, food_left in results for record in food_left), dtype=np.int64, count=sum(counts))
+    food = np.fromiter((record['remaining_food'] for _, food_left in results for record in food_left), dtype=np.int64, count=sum(counts))
+    return {'run': run, 'after_nr_steps': steps, 'remaining_food': food}
+
+
+def save_food_columns(path, columns, compress=True):
+    # Write {column: array} (e.g. from food_columns) to a .npz file
+    typed = {name: _smallest_uint(columns[name]) for name in FOOD_COLUMNS}
+    (np.savez_compressed if compress else np.savez)(path, **typed)
+
+
+def load_food_columns(path, mmap=True):
+    """{column: array} of a .npz file written by save_food_columns.
+
+    Columns stored without compression are memory-mapped (read-only) when mmap is True,
+    compressed columns are read into memory.
+    """
+    columns = {}
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                columns[name] = _memmap_member(path, info)
+            else:
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+    return columns
+
+
+def _memmap_member(path, info):
+    # Memory-map one uncompressed .npy member of a .npz file
+    with open(path, 'rb') as file:
+        file.seek(info.header_offset)
+        local_header = file.read(30)                        # Fixed part of the zip entry header
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def csv_columns(food_file):
+    # {column: int64 array} of a food tracking .csv file (run, after_nr_steps, remaining_food)
+    table = np.loadtxt(food_file, delimiter=',', skiprows=1, dtype=np.int64, ndmin=2).reshape(-1, len(FOOD_COLUMNS))
+    return dict(zip(FOOD_COLUMNS, table.T))
+
+
+def csv_to_columns(food_file, path, compress=True):
+    # Convert a food tracking .csv file to a .npz file
+    save_food_columns(path, csv_columns(food_file), compress)
+
+
+def columns_to_csv(path, food_file):
+    # Write a .npz file back as a food tracking .csv file, the same as save_results writes
+    columns = load_food_columns(path)
+    table = np.column_stack([np.asarray(columns[name], dtype=np.int64) for name in FOOD_COLUMNS])
+    np.savetxt(food_file, table, fmt='%d', delimiter=',', header=','.join(FOOD_COLUMNS), comments='', newline=os.linesep)
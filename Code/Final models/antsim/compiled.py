@@ -0,0 +1,187 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - compiled replicate kernel                         ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The rules of Ant.move branch on every ant (pheromone or random walk, food or not,
+## arrived home or not), which NumPy can only batch with masks. simulate_replicate runs a
+## whole replicate of the model, with or without pheromones, as plain loops over flat
+## arrays, compiled with numba when it is installed. The ants move one by one in ant
+## order, exactly like Ant.move, and the diffusion visits the cells in the same order as
+## the recursion in Ant.pheromone_diffusion. The random numbers come from numba's own generator, so a run
+## does not reproduce the Python run with the same seed, but the step statistics match
+## (see Code/Benchmarks/parity_compiled.py).
+##
+## numba is optional: without it the kernel is plain Python (correct but very slow), so
+## run_replicate checks HAVE_NUMBA and uses the Python classes instead.
+
+import numpy as np
+
+from .diffusion import diffusion_kernel
+from .tables import MOVES, move_table
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:                                         # numba is not installed: keep the kernel as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+@njit(cache=True)
+def _deposit(grid, x, y, value, depth, starts, dx, dy, scale, min_x, max_x, min_y, max_y, pheromone_max):
+    # Visits of the diffusion recursion for this depth, in call order (see DiffusionKernel)
+    size = grid.shape[0]
+    for k in range(starts[depth], starts[depth + 1]):
+        if x + min_x[k] < 0 or x + max_x[k] >= size or y + min_y[k] < 0 or y + max_y[k] >= size:
+            continue                                        # The path of the recursion to this cell leaves the arena
+        new_x = x + dx[k]
+        new_y = y + dy[k]
+        current = grid[new_x, new_y]
+        deposit = value * scale[k]
+        if current > deposit:
+            deposit = current
+        grid[new_x, new_y] = min(current + deposit, pheromone_max)
+
+
+@njit(cache=True)
+def simulate_replicate(seed, food, colony_cells, in_colony, home_direction, moves, table, counts, ants, pheromones,
+                       pheromone_start, pheromone_min_detectable, pheromone_max, evaporation_rate,
+                       diffusion_distance, starts, dx, dy, scale, min_x, max_x, min_y, max_y, track_every):
+    """Run one replicate until all food is gone.
+
+    food is changed in place. pheromones = False runs the model without pheromones.
+    Returns (total_steps, tracked): the food left after every track_every steps, and 0
+    after the last step.
+    """
+    np.random.seed(seed)
+    size = food.shape[0]
+    grid = np.zeros((size, size) if pheromones else (0, 0))   # No pheromone grid in the model without pheromones
+    remaining = food.sum()
+
+    positions = np.empty((ants, 2), dtype=np.int64)
+    for i in range(ants):
+        cell = int(np.random.random() * len(colony_cells))
+        positions[i, 0] = colony_cells[cell, 0]
+        positions[i, 1] = colony_cells[cell, 1]
+    has_food = np.zeros(ants, dtype=np.bool_)
+    paths = np.zeros((ants, size + 1, 2), dtype=np.int64)  # A homing trip is never longer than the arena
+    path_lengths = np.zeros(ants, dtype=np.int64)
+    weights = np.zeros(8)
+    candidates = np.zeros(8, dtype=np.int64)
+    tracked = np.zeros(16, dtype=np.int64)
+    n_tracked = 0
+    total_steps = 0
+
+    while remaining > 0:
+        for i in range(ants):
+            x = positions[i, 0]
+            y = positions[i, 1]
+            if not has_food[i]:
+                # Search for food: follow the pheromone when it is detectable, otherwise walk randomly
+                if pheromones and grid[x, y] >= pheromone_min_detectable:
+                    n = 0
+                    total = 0.0
+                    for m in range(8):
+                        new_x = x + moves[m, 0]
+                        new_y = y + moves[m, 1]
+                        if 0 <= new_x < size and 0 <= new_y < size:
+                            candidates[n] = m
+                            total += grid[new_x, new_y]
+                            weights[n] = total          # Cumulative pheromone of the valid moves
+                            n += 1
+                    if total > 0:
+                        draw = np.random.random() * total
+                        k = 0
+                        while k < n - 1 and weights[k] <= draw:
+                            k += 1
+                    else:
+                        k = int(np.random.random() * n)
+                    move = candidates[k]
+                else:
+                    move = table[x, y, int(np.random.random() * counts[x, y])]
+                x += moves[move, 0]
+                y += moves[move, 1]
+                positions[i, 0] = x
+                positions[i, 1] = y
+                if food[x, y] > 0:                          # Take one unit of food and start recording the path
+                    food[x, y] -= 1
+                    remaining -= 1
+                    has_food[i] = True
+                    paths[i, 0, 0] = x
+                    paths[i, 0, 1] = y
+                    path_lengths[i] = 1
+            else:
+                # Return to the colony and deposit pheromone along the whole path
+                step_x = home_direction[x, y, 0]
+                step_y = home_direction[x, y, 1]
+                x += step_x
+                y += step_y
+                positions[i, 0] = x
+                positions[i, 1] = y
+                length = path_lengths[i]
+                paths[i, length, 0] = x
+                paths[i, length, 1] = y
+                length += 1
+                path_lengths[i] = length
+                for j in range(length if pheromones else 0):
+                    value = pheromone_start * np.exp(-j / length)
+                    depth = -1
+                    while depth < diffusion_distance and value / 2.0 ** (depth + 1) >= pheromone_min_detectable:
+                        depth += 1
+                    if depth >= 0:
+                        _deposit(grid, paths[i, j, 0], paths[i, j, 1], value, depth,
+                                 starts, dx, dy, scale, min_x, max_x, min_y, max_y, pheromone_max)
+                if in_colony[x, y]:                         # Food delivered, start a new trip from the colony
+                    has_food[i] = False
+                    path_lengths[i] = 0
+                    cell = int(np.random.random() * len(colony_cells))
+                    positions[i, 0] = colony_cells[cell, 0]
+                    positions[i, 1] = colony_cells[cell, 1]
+
+        # Evaporation, same as Arena.update_pheromones
+        for x in range(grid.shape[0]):
+            for y in range(grid.shape[1]):
+                value = grid[x, y] * (1 - evaporation_rate)
+                grid[x, y] = value if value >= pheromone_min_detectable else 0.0
+        total_steps += 1
+
+        if total_steps % track_every == 0:
+            if n_tracked == len(tracked):
+                tracked = np.concatenate((tracked, np.zeros(len(tracked), dtype=np.int64)))
+            tracked[n_tracked] = remaining
+            n_tracked += 1
+
+    if n_tracked == len(tracked):
+        tracked = np.concatenate((tracked, np.zeros(1, dtype=np.int64)))
+    tracked[n_tracked] = 0
+    return total_steps, tracked[:n_tracked + 1]
+
+
+def run_compiled(arena):
+    """Run one replicate on an initialised arena with the compiled kernel.
+
+    Returns (total_steps, food_left) like antsim.experiment.run_replicate. The kernel
+    seed is drawn from the arena's random number provider, so runs stay reproducible.
+    """
+    config = arena.config
+    size = arena.arena_size
+    kernel = diffusion_kernel(config.diffusion_distance, config.pheromone_min_detectable, config.pheromone_max, config.pheromone_start)
+    table, counts = move_table(size)
+    colony_cells = np.array(arena.colony_area)
+    in_colony = arena.in_colony
+    starts = np.append(kernel.sequence_starts, kernel.sequence_starts[-1] + kernel.sequence_counts[-1])
+    dx, dy, scale, min_x, max_x, min_y, max_y = kernel.sequences
+    seed = arena.rng.integers(2 ** 31)
+    total_steps, tracked = simulate_replicate(
+        seed, np.array(arena.food_sources.grid), colony_cells, in_colony, np.asarray(arena.home_direction), MOVES,
+        np.asarray(table), np.asarray(counts), config.ants, config.pheromones, float(config.pheromone_start),
+        float(config.pheromone_min_detectable), float(config.pheromone_max), float(config.evaporation_rate),
+        kernel.depth, starts, dx, dy, scale, min_x, max_x, min_y, max_y, config.track_every)   # Deepest level of the kernel, not deeper than diffusion_distance
+    track_every = config.track_every
+    steps = [(k + 1) * track_every for k in range(len(tracked) - 1)] + [total_steps]
+    return total_steps, [{'steps': s, 'remaining_food': int(food)} for s, food in zip(steps, tracked)]
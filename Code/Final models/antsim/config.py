@@ -0,0 +1,43 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - simulation parameters                             ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## All parameters of one model configuration in one object, instead of module globals
+## that the classes read directly. A configuration is immutable, so it can be shared by
+## all replicates and sent to the worker processes as it is; use config.replace(...) to
+## derive a variant (e.g. a larger arena for an experiment).
+
+from dataclasses import dataclass, replace
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Parameters of the ant foraging model (defaults = baseline experiment with pheromones)."""
+
+    arena_size: int = 20                    # Size of arena => should be even since middle calculation (for colony) is based on even grid sizes
+    colony_size: int = 4                    # Size of the colony (colony_size x colony_size cells in the middle of the arena)
+    ants: int = 10                          # Number of foraging ants in arena
+    food_sources: int = 4                   # Number of food sources distributed throughout arena
+    food_value: int = 25                    # Value of the food source at beginning of run
+    pheromones: bool = True                 # False = model without pheromones: the ants always walk randomly, the pheromone parameters below are not used
+    pheromone_start: float = 100            # Level of pheromone when just deposited (highest level)
+    pheromone_min_detectable: float = 25    # Below this value the ants can no longer detect the pheromone
+    pheromone_max: float = 1000             # Maximal deposition of the pheromone
+    evaporation_rate: float = 0.10          # Pheromone evaporation rate per step (declines by this proportion)
+    diffusion_distance: int = 2             # Cells until where the pheromone can diffuse
+    evaporation_mode: str = 'tiles'         # 'dense' = evaporate the whole grid every step, 'tiles' = only the parts of the arena that have pheromone, 'lazy' = only when a cell is read or written
+    engine: str = 'colony'                  # 'colony' = all ants as arrays in a Colony, 'ants' = one Ant object per ant, moved in turn (the original model, same results as before the colony engine for the same seed)
+    backend: str = 'python'                 # 'python' = Arena and Colony or Ant (see engine), 'numba' = compiled replicate loop (falls back to 'python' when numba is not installed)
+    track_every: int = 100                  # Record the food left every track_every steps
+
+    def __post_init__(self):
+        # A misspelled engine or backend would otherwise quietly run another model
+        if self.engine not in ('colony', 'ants'):
+            raise ValueError(f"Unknown engine {self.engine!r}, use 'colony' or 'ants'")
+        if self.backend not in ('python', 'numba'):
+            raise ValueError(f"Unknown backend {self.backend!r}, use 'python' or 'numba'")
+
+    def replace(self, **changes):
+        # Copy of this configuration with some parameters changed
+        return replace(self, **changes)
@@ -0,0 +1,186 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - pheromone diffusion kernel                        ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Ant.pheromone_diffusion deposits on a cell and then recurses into all 8 neighbours
+## with half the value, until the value is no longer detectable or diffusion_distance is
+## reached. Cells are visited several times (a neighbour is also a neighbour of its
+## neighbours), and every visit adds max(existing, value) to the cell, capped at
+## pheromone_max (see Arena.set_pheromone_value), so the order of the visits matters.
+##
+## The kernel below precomputes the sequence of visits of the recursion once, as offsets
+## from the deposit cell, and splits it into rounds in which every cell is visited at
+## most once (the n-th visit of a cell goes into round n). Applying the rounds one after
+## the other with array indexing gives exactly the same grid as the recursion, with a
+## fixed number of array operations per deposit instead of up to 1 + 8 + 64 calls.
+##
+## Ant.leave_pheromone deposits along the whole path of the ant on every homing step.
+## deposit_path() does all those deposits at once: it concatenates the visits of every
+## deposit in path order and applies them in rounds in the same way, so it gives the
+## same grid as calling deposit() for every position of the path one after the other.
+## With a stack of grids (one per replicate) the deposits of all replicates are done in
+## one call: visits to different grids never fall on the same cell, so they share rounds.
+##
+## The recursion tree has 8^depth visits, so the kernel is only built up to the depth the
+## largest usual deposit can reach (max_value, pheromone_start in the model: 2 with the
+## default parameters, whatever diffusion_distance is), and diffusion_kernel() caches it
+## on its parameters, so all arenas of an experiment share one kernel. A larger deposit
+## still diffuses as deep as the recursion would (up to diffusion_distance): it is passed
+## on to a shared kernel built to the depth it needs.
+
+from functools import lru_cache
+
+import numpy as np
+
+
+class DiffusionKernel:
+    """Precomputed stamp that deposits and diffuses pheromone around one cell."""
+
+    def __init__(self, diffusion_distance=2, pheromone_min_detectable=25, pheromone_max=1000, max_value=None):
+        self.diffusion_distance = diffusion_distance                # Cells until where the pheromone can diffuse
+        self.pheromone_min_detectable = pheromone_min_detectable    # Diffusion stops below this value
+        self.pheromone_max = pheromone_max                          # Maximal pheromone level of a cell
+        # Deepest level of the recursion that is built: the depth of the largest usual deposit (max_value), if known
+        self.depth = diffusion_distance if max_value is None else max(self.depth_limit(max_value), 0)
+        visits = self.recursion_visits(self.depth)
+        # One list of rounds for every depth the recursion can reach (deeper visits need a higher deposit)
+        self.rounds = [self.split_rounds([visit for visit in visits if visit[2] <= depth])
+                       for depth in range(self.depth + 1)]
+        # The visits for every depth in call order, stored one after the other (used by deposit_path)
+        sequences = [[(dx, dy, 0.5 ** d) + chain for dx, dy, d, chain in visits if d <= depth]
+                     for depth in range(self.depth + 1)]
+        self.sequence_counts = np.array([len(sequence) for sequence in sequences])
+        self.sequence_starts = np.cumsum(self.sequence_counts) - self.sequence_counts
+        self.sequences = tuple(np.array(column) for column in zip(*sum(sequences, [])))
+
+    @staticmethod
+    def recursion_visits(diffusion_distance):
+        # Visits of Ant.pheromone_diffusion in call order: (dx, dy, depth, chain)
+        # chain = bounding box of all cells on the way to this one, which must all lie inside the arena
+        visits = []
+
+        def visit(dx, dy, depth, chain):
+            visits.append((dx, dy, depth, chain))
+            if depth == diffusion_distance:
+                return
+            for direction_x in [-1, 0, 1]:
+                for direction_y in [-1, 0, 1]:
+                    if direction_x == 0 and direction_y == 0:
+                        continue
+                    new_x, new_y = dx + direction_x, dy + direction_y
+                    new_chain = (min(chain[0], new_x), max(chain[1], new_x), min(chain[2], new_y), max(chain[3], new_y))
+                    visit(new_x, new_y, depth + 1, new_chain)
+
+        visit(0, 0, 0, (0, 0, 0, 0))
+        return visits
+
+    @staticmethod
+    def split_rounds(visits):
+        # The n-th visit of a cell goes into round n, so no round touches a cell twice
+        seen = {}
+        rounds = []
+        for dx, dy, depth, chain in visits:
+            n = seen.get((dx, dy), 0)
+            seen[(dx, dy)] = n + 1
+            if n == len(rounds):
+                rounds.append([])
+            rounds[n].append((dx, dy, 0.5 ** depth) + chain)
+        # Store every round as arrays: dx, dy, scale, chain min/max x, chain min/max y
+        return [tuple(np.array(column) for column in zip(*round_visits)) for round_visits in rounds]
+
+    def depth_limit(self, value):
+        # Deepest level of the recursion reached for a deposit of this value (-1 = nothing is deposited)
+        depth = -1
+        while depth < self.diffusion_distance and value / 2 ** (depth + 1) >= self.pheromone_min_detectable:
+            depth += 1
+        return depth
+
+    def depth_limits(self, values):
+        # Same as depth_limit, for an array of deposit values
+        depths = np.full(len(values), -1)
+        for depth in range(self.diffusion_distance + 1):
+            depths += values / 2 ** depth >= self.pheromone_min_detectable
+        return depths
+
+    def deeper_kernel(self, depth):
+        # Shared kernel built to depth, for deposits deeper than this kernel (larger than max_value)
+        return diffusion_kernel(self.diffusion_distance, self.pheromone_min_detectable, self.pheromone_max,
+                                self.pheromone_min_detectable * 2 ** depth)
+
+    def deposit(self, grid, position, value):
+        # Deposit value on position and diffuse it, same result as the recursive Ant.pheromone_diffusion
+        depth = self.depth_limit(value)
+        if depth < 0:
+            return
+        if depth > self.depth:
+            return self.deeper_kernel(depth).deposit(grid, position, value)
+        x, y = position
+        size_x, size_y = grid.shape
+        inside = depth <= x < size_x - depth and depth <= y < size_y - depth   # Whole stamp inside the arena
+        for dx, dy, scale, min_x, max_x, min_y, max_y in self.rounds[depth]:
+            new_x, new_y, values = x + dx, y + dy, value * scale
+            if not inside:
+                # Skip visits whose path from the deposit cell leaves the arena
+                keep = (x + min_x >= 0) & (x + max_x < size_x) & (y + min_y >= 0) & (y + max_y < size_y)
+                new_x, new_y, values = new_x[keep], new_y[keep], values[keep]
+            current = grid[new_x, new_y]
+            grid[new_x, new_y] = np.minimum(current + np.maximum(current, values), self.pheromone_max)
+
+    def deposit_path(self, grid, positions, values, layers=None):
+        # Deposit values[j] on positions[j] for every j, in path order, same result as calling deposit() for each
+        # grid can also be a stack of grids (layers, x, y): layers[j] is then the grid of deposit j
+        positions = np.asarray(positions)
+        values = np.asarray(values, dtype=float)
+        depths = self.depth_limits(values)
+        if len(depths) and depths.max() > self.depth:
+            return self.deeper_kernel(int(depths.max())).deposit_path(grid, positions, values, layers)
+        keep = depths >= 0                                  # Values below the detection threshold are not deposited
+        positions, values, depths = positions[keep], values[keep], depths[keep]
+        if layers is not None:
+            layers = np.asarray(layers)[keep]
+        elif len(depths) < 10:
+            # Short paths: the deposits one by one are cheaper than building the rounds
+            for position, value in zip(positions, values):
+                self.deposit(grid, position, value)
+            return
+
+        # All visits of all deposits, in call order: visit number i belongs to deposit owner[i]
+        counts = self.sequence_counts[depths]
+        owner = np.repeat(np.arange(len(depths)), counts)
+        first = np.cumsum(counts) - counts
+        visit = self.sequence_starts[depths][owner] + np.arange(counts.sum()) - first[owner]
+        dx, dy, scale, min_x, max_x, min_y, max_y = (column[visit] for column in self.sequences)
+        x, y = positions[owner, 0], positions[owner, 1]
+
+        # Skip visits whose path from the deposit cell leaves the arena
+        size_x, size_y = grid.shape[-2:]
+        keep = (x + min_x >= 0) & (x + max_x < size_x) & (y + min_y >= 0) & (y + max_y < size_y)
+        new_x, new_y = (x + dx)[keep], (y + dy)[keep]
+        new_values = (values[owner] * scale)[keep]
+        cells = new_x * size_y + new_y
+        if layers is not None:
+            new_layers = layers[owner][keep]
+            cells += new_layers * (size_x * size_y)         # Cells of different grids never coincide
+
+        # The n-th visit of a cell goes into round n (stable sort keeps the call order within a cell)
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        index = np.arange(len(order))
+        group_start = np.maximum.accumulate(np.where(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]], index, 0))
+        rounds = np.empty_like(index)
+        rounds[order] = index - group_start
+        if len(rounds) == 0:
+            return
+
+        by_round = np.argsort(rounds, kind='stable')
+        for visits in np.split(by_round, np.searchsorted(rounds[by_round], np.arange(1, rounds.max() + 1))):
+            cell = (new_x[visits], new_y[visits]) if layers is None else (new_layers[visits], new_x[visits], new_y[visits])
+            current = grid[cell]
+            grid[cell] = np.minimum(current + np.maximum(current, new_values[visits]), self.pheromone_max)
+
+
+@lru_cache(maxsize=None)
+def diffusion_kernel(diffusion_distance, pheromone_min_detectable, pheromone_max, max_value=None):
+    """Shared DiffusionKernel for these parameters (built once, see DiffusionKernel)."""
+    return DiffusionKernel(diffusion_distance, pheromone_min_detectable, pheromone_max, max_value)
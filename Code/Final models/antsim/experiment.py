@@ -0,0 +1,191 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - running experiments                               ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## An experiment is a number of independent replicates of one SimulationConfig. Every
+## replicate runs until all food is gone and returns (total_steps, food_left), with
+## food_left the food still in the arena every config.track_every steps, as a list of
+## {'steps': ..., 'remaining_food': ...} records (the last one is 0 food at the last step).
+##
+## Importing this module only imports NumPy: pandas is imported when the results are
+## written, so worker processes and other code that drives the model start quickly.
+
+import os
+from contextlib import ExitStack
+from functools import partial
+from time import perf_counter
+
+from .batch import iter_batched_replicates
+from .colony import Colony
+from .config import SimulationConfig
+from .metrics import Metrics, RemainingFood
+from .profiling import PhaseProfile, ProfileWriter
+from .model import Arena, Ant
+from .replicates import iter_replicates, seed_replicate
+from .trajectory import TrajectoryWriter
+
+
+def run_replicate(config, seed=None, metrics=None, profile=None):
+    """Simulate one replicate of config until all food is gone, returns (total_steps, food_left).
+
+    metrics: a Metrics with extra probes (see antsim.metrics), filled during the run.
+    profile: a PhaseProfile that times the phases of the run (see antsim.profiling).
+    The numba backend has no probes or phases, so with either the Python backend is used.
+    """
+    rng = seed_replicate(seed)                              # Random number provider of this run
+    arena = Arena(config, rng=rng)                          # Initialise the arena for the current run (the ants draw from the same provider)
+    if config.backend == 'numba' and metrics is None and profile is None:
+        from .compiled import HAVE_NUMBA, run_compiled      # Imported here, importing numba is slow
+        if HAVE_NUMBA:
+            return run_compiled(arena)
+    if config.engine == 'ants':
+        ants = [Ant(arena) for _ in range(config.ants)]     # One object per ant, moved in turn
+        move_ants = partial(_move_all, ants)
+    else:
+        ants = Colony(arena, config.ants, config.pheromone_start, config.pheromone_min_detectable, rng=rng)    # All ants at once (same rules as Ant.move)
+        move_ants = ants.step
+    if profile is not None:
+        profile.instrument_run(arena, ants)                 # Timed methods on these objects only
+    update_pheromones = arena.update_pheromones if arena.pheromones is not None else None    # Nothing to evaporate without pheromones
+    tracking = RemainingFood(config.track_every, capacity=256, overwrite=False)     # Food still in the arena after every track_every steps
+    probes = Metrics(tracking, *(metrics or ()))
+    next_sample = probes.bind(arena, ants)                  # Next step at which a probe is due
+    total_steps = 0                                         # Initialise the total number of steps taken
+
+    while arena.food_sources.remaining > 0:                 # Run until all food is gone
+        move_ants()                                         # Move all ants based on their behavior
+        if update_pheromones is not None:
+            update_pheromones()                             # Update the pheromone grid to stimulate evaporation
+        total_steps += 1
+
+        if total_steps == next_sample:
+            next_sample = probes.sample(total_steps)
+
+    steps, remaining = tracking.records()
+    food_left = [{'steps': int(step), 'remaining_food': int(food)} for step, food in zip(steps, remaining)]
+    food_left.append({'steps': total_steps, 'remaining_food': 0})   # All food is gone, add the last value
+    return total_steps, food_left
+
+
+def _move_all(ants_list):
+    # One step of the original model: every ant moves in turn
+    for ant in ants_list:
+        ant.move()
+
+
+def _replicate(config, run, seed, trace_dir=None, trajectories=False, profiled=False):
+    # run_replicate with the (run, seed) arguments of iter_replicates (module level for the worker processes)
+    if trace_dir is None and not trajectories and not profiled:
+        return run_replicate(config, seed)
+    from .trace import TraceRecorder, trace_file
+    from .trajectory import TrajectoryRecorder
+    trace = TraceRecorder() if trace_dir is not None else None
+    trajectory = TrajectoryRecorder() if trajectories else None
+    profile = PhaseProfile() if profiled else None
+    start = perf_counter()
+    result = run_replicate(config, seed, Metrics(*(probe for probe in (trace, trajectory) if probe is not None)), profile)
+    seconds = perf_counter() - start
+    if trace is not None:
+        trace.trace().save(trace_file(trace_dir, run))      # Same run, also stored as a trace
+    if not trajectories and not profiled:
+        return result
+    extras = {}                                             # Written to their files by the main process
+    if trajectory is not None:
+        extras['trajectory'] = trajectory.records()
+    if profile is not None:
+        extras['profile'] = {'total_steps': result[0], 'seconds': seconds, 'phases': profile.summary()}
+    return result, extras
+
+
+def _write_extras(replicates, first_run, trajectory_file, profile_file):
+    # Write the trajectory and profile of every run in run order, yield the (total_steps, food_left) of the run
+    with ExitStack() as files:
+        trajectories = files.enter_context(TrajectoryWriter(trajectory_file, first_run)) if trajectory_file is not None else None
+        profiles = files.enter_context(ProfileWriter(profile_file, first_run)) if profile_file is not None else None
+        for run, (result, extras) in enumerate(replicates, start=first_run):
+            if trajectories is not None:
+                trajectories.write(run, extras['trajectory'])
+            if profiles is not None:
+                profiles.write(run, extras['profile'])
+            yield result
+
+
+def iter_experiment(config, runs, workers=None, seed=None, batch_size=None, first_run=0, trace_dir=None,
+                    trajectory_file=None, profile_file=None, executor=None):
+    """Yield (total_steps, food_left) for runs replicates of config, in run order.
+
+    workers = None uses all cores, workers = 1 runs everything in the current process.
+    seed is the master seed of the runs: the results do not depend on workers.
+    batch_size = None runs one arena per replicate, otherwise batch_size replicates are
+    simulated together as one stack of arenas (see antsim.batch), with the rules of the
+    colony engine in Python: config.engine must be 'colony' and config.backend 'python'.
+    The stack is always evaporated as a whole (config.evaporation_mode has no effect, the
+    levels are the same).
+    first_run continues an experiment: the runs from first_run on are the same as in one
+    experiment of first_run + runs replicates (not with batch_size).
+    trace_dir: folder in which the trace of every run is stored (see antsim.trace), written
+    by the worker processes, one file per run (not with batch_size).
+    trajectory_file: store the position and state of every ant at every step of every run
+    in this trajectory file (see antsim.trajectory, not with batch_size). With first_run,
+    the runs before first_run in the file are kept.
+    profile_file: time the phases of every run (see antsim.profiling) and write them to
+    this file, one JSON line per run (not with batch_size). Same first_run rule.
+    executor: an open ProcessPoolExecutor to run the replicates in (see iter_replicates,
+    not with batch_size).
+    """
+    if batch_size:
+        if first_run or trace_dir is not None or trajectory_file is not None or profile_file is not None or executor is not None:
+            raise ValueError("first_run, trace_dir, trajectory_file, profile_file and executor can not be combined with batch_size")
+        if config.engine != 'colony' or config.backend != 'python':
+            # The batch would quietly run another engine or backend than configured
+            raise ValueError(f"batch_size runs the colony engine in Python, not engine={config.engine!r} "
+                             f"with backend={config.backend!r}: use engine='colony' and backend='python'")
+        return iter_batched_replicates(config, runs, batch_size, workers, seed)
+    if trace_dir is not None:
+        os.makedirs(trace_dir, exist_ok=True)
+    replicate = partial(_replicate, config, trace_dir=trace_dir, trajectories=trajectory_file is not None,
+                        profiled=profile_file is not None)
+    replicates = iter_replicates(replicate, runs, workers, seed, first_run, executor)
+    if trajectory_file is None and profile_file is None:
+        return replicates
+    return _write_extras(replicates, first_run, trajectory_file, profile_file)
+
+
+def run_experiment(config=None, runs=1000, workers=None, seed=None, batch_size=None):
+    # Same as iter_experiment, but collect all results in a list
+    config = SimulationConfig() if config is None else config
+    return list(iter_experiment(config, runs, workers, seed, batch_size))
+
+
+def result_tables(results):
+    """Rows of the two result files of an experiment.
+
+    Returns (steps_rows, food_rows): {'run', 'total_steps'} per run and
+    {'run', 'after_nr_steps', 'remaining_food'} per food record, runs numbered from 1.
+    """
+    steps_rows = []
+    food_rows = []
+    for run, (total_steps, food_left) in enumerate(results, start=1):
+        steps_rows.append({'run': run, 'total_steps': total_steps})
+        for record in food_left:
+            food_rows.append({'run': run, 'after_nr_steps': record['steps'], 'remaining_food': record['remaining_food']})
+    return steps_rows, food_rows
+
+
+def save_results(results, steps_file, food_file, columns_file=None, compress=True):
+    """Write the results as the .csv files read by the R scripts, returns the two DataFrames.
+
+    columns_file: also store the food tracking as binary columns in this .npz file (see antsim.columnar),
+    compress=False stores them uncompressed so they can be memory-mapped.
+    """
+    import pandas as pd
+    steps_rows, food_rows = result_tables(results)
+    df_steps = pd.DataFrame(steps_rows)
+    df_steps.to_csv(steps_file, index=False)                # Index=F indicates that we don't want the index column as a column in the final dataset
+    df_food = pd.DataFrame(food_rows)
+    df_food.to_csv(food_file, index=False)
+    if columns_file is not None:
+        from .columnar import food_columns, save_food_columns
+        save_food_columns(columns_file, food_columns(results), compress)
+    return df_steps, df_food
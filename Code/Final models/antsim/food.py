@@ -0,0 +1,64 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - food bookkeeping                                  ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The arena used to keep its food in a plain dictionary {(x, y): value} and summed all
+## values whenever it needed the food left. FoodSources still behaves like that
+## dictionary, but every change also updates a dense grid with the food per cell and a
+## running total of the food left, so both are always in sync and can be read in
+## constant time. The grid and the total are read-only from outside: all changes go
+## through the dictionary interface or take().
+
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class FoodSources(MutableMapping):
+    """Food source positions and values, mirrored in a dense grid with a running total."""
+
+    def __init__(self, arena_size):
+        self._values = {}                                           # {(x, y): food value}, as the original dictionary
+        self._grid = np.zeros((arena_size, arena_size), dtype=np.int64)
+        self._remaining = 0
+        self.grid = self._grid.view()                               # Read-only view on the food value of every cell
+        self.grid.flags.writeable = False
+
+    @property
+    def remaining(self):                                            # Total food left in the arena
+        return self._remaining
+
+    def __getitem__(self, position):
+        return self._values[position]
+
+    def __setitem__(self, position, value):
+        x, y = position
+        position = (int(x), int(y))
+        self._remaining += value - self._values.get(position, 0)
+        self._values[position] = value
+        self._grid[x, y] = value
+
+    def __delitem__(self, position):
+        x, y = position
+        self._remaining -= self._values.pop(position)
+        self._grid[x, y] = 0
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"FoodSources({self._values!r})"
+
+    def take(self, position):
+        # Remove one unit of food from position, returns whether there was food to take
+        x, y = position
+        if self._grid[x, y] <= 0:
+            return False
+        self._grid[x, y] -= 1
+        self._values[(int(x), int(y))] -= 1
+        self._remaining -= 1
+        return True
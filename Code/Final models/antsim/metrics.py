@@ -0,0 +1,207 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - metrics during a run                              ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## A probe measures one quantity of a running simulation (food left, food per source,
+## ants carrying food, total pheromone, part of the arena with a detectable trail) every
+## `interval` steps. Its samples go into a ring buffer that is allocated when the probe is
+## made, so sampling allocates no new arrays: a full buffer either overwrites its oldest
+## samples or, with overwrite=False, doubles in size (only a few times per run). Metrics
+## groups the probes of a run and keeps the next step at which any probe is due, so the
+## main loop only compares two integers per step. The food tracking of run_replicate is a
+## RemainingFood probe with interval config.track_every.
+##
+## Probes read the arena and the ants of either engine: a Colony (arrays) or a list of
+## Ant objects (ant_positions and ants_have_food read both, also for the recorders and
+## renderers in other modules). They do not run inside the batch engine or the numba backend.
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated buffer of the last capacity (step, value) samples."""
+
+    def __init__(self, capacity, shape=(), dtype=np.float64, overwrite=True):
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.overwrite = overwrite                          # False = grow instead of dropping the oldest samples
+        self.count = 0                                      # Number of samples ever written
+
+    @property
+    def capacity(self):
+        return len(self.steps)
+
+    def clear(self):
+        self.count = 0
+
+    def slot(self, step):
+        # Index of the row for the sample at step (the caller fills self.values at that index)
+        if self.count == self.capacity and not self.overwrite:
+            self._grow()
+        i = self.count % self.capacity
+        self.steps[i] = step
+        self.count += 1
+        return i
+
+    def _grow(self):
+        self.steps = np.concatenate([self.steps, np.zeros_like(self.steps)])
+        self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+
+    def records(self):
+        # (steps, values) of the samples in the buffer, oldest first (copies)
+        n = min(self.count, self.capacity)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        order = (np.arange(n) + start) % self.capacity
+        return self.steps[order], self.values[order]
+
+
+def ant_positions(ants):
+    # (n_ants, 2) positions of a Colony or a list of Ant objects
+    if hasattr(ants, 'positions'):                          # Colony (or a replayed trace): one array for all ants
+        return ants.positions
+    return np.array([ant.position for ant in ants], dtype=np.int64).reshape(-1, 2)
+
+
+def ants_have_food(ants):
+    # Whether every ant of a Colony or a list of Ant objects is carrying food
+    if hasattr(ants, 'has_food'):
+        return ants.has_food
+    return np.array([ant.has_food for ant in ants], dtype=bool)
+
+
+class Probe:
+    """One quantity, sampled every interval steps into a ring buffer."""
+
+    name = None
+    dtype = np.float64
+
+    def __init__(self, interval=100, capacity=4096, overwrite=True):
+        self.interval = interval
+        self.capacity = capacity
+        self.overwrite = overwrite
+        self.buffer = None
+
+    def shape(self, arena):
+        # Shape of one sample
+        return ()
+
+    def bind(self, arena, ants):
+        # Start a new run: (re)allocate the buffer when the shape changed, forget old samples
+        self.arena = arena
+        self.ants = ants
+        shape = self.shape(arena)
+        if self.buffer is None or self.buffer.values.shape[1:] != shape:
+            self.buffer = RingBuffer(self.capacity, shape, self.dtype, self.overwrite)
+        self.buffer.clear()
+
+    def record(self, step):
+        i = self.buffer.slot(step)
+        self.buffer.values[i] = self.measure()
+
+    def measure(self):
+        raise NotImplementedError
+
+    def records(self):
+        return self.buffer.records()
+
+
+class RemainingFood(Probe):
+    """Total food left in the arena."""
+
+    name = 'remaining_food'
+    dtype = np.int64
+
+    def measure(self):
+        return self.arena.food_sources.remaining
+
+
+class FoodPerSource(Probe):
+    """Food left at every food source, in the order of arena.food_sources at the start."""
+
+    name = 'food_per_source'
+    dtype = np.int64
+
+    def shape(self, arena):
+        return (len(arena.food_sources),)
+
+    def bind(self, arena, ants):
+        super().bind(arena, ants)
+        xs, ys = zip(*arena.food_sources) if len(arena.food_sources) else ((), ())
+        self.cells = np.ravel_multi_index((np.array(xs, dtype=np.intp), np.array(ys, dtype=np.intp)), arena.food_sources.grid.shape)
+
+    def record(self, step):
+        i = self.buffer.slot(step)
+        np.take(self.arena.food_sources.grid, self.cells, out=self.buffer.values[i])    # Straight into the buffer row
+
+
+class AntsCarrying(Probe):
+    """Number of ants carrying food."""
+
+    name = 'ants_carrying'
+    dtype = np.int64
+
+    def measure(self):
+        return np.count_nonzero(ants_have_food(self.ants))
+
+
+class PheromoneMass(Probe):
+    """Total pheromone in the arena (0 without pheromones)."""
+
+    name = 'pheromone_mass'
+
+    def measure(self):
+        if self.arena.pheromones is None:
+            return 0.0
+        return self.arena.pheromone_levels().sum()
+
+
+class TrailCoverage(Probe):
+    """Fraction of the arena where the ants can detect pheromone (0 without pheromones)."""
+
+    name = 'trail_coverage'
+
+    def bind(self, arena, ants):
+        super().bind(arena, ants)
+        self.detectable = np.zeros((arena.arena_size, arena.arena_size), dtype=bool)   # Reused for every sample
+
+    def measure(self):
+        if self.arena.pheromones is None:
+            return 0.0
+        np.greater_equal(self.arena.pheromone_levels(), self.arena.config.pheromone_min_detectable, out=self.detectable)
+        return np.count_nonzero(self.detectable) / self.detectable.size
+
+
+class Metrics:
+    """The probes of a run, sampled when they are due."""
+
+    def __init__(self, *probes):
+        self.probes = list(probes)
+        self.next_step = None
+
+    def __iter__(self):
+        return iter(self.probes)
+
+    def __getitem__(self, name):
+        for probe in self.probes:
+            if probe.name == name:
+                return probe
+        raise KeyError(name)
+
+    def bind(self, arena, ants):
+        # Start a new run, returns the first step at which a probe is due
+        for probe in self.probes:
+            probe.bind(arena, ants)
+        self.next_step = min((probe.interval for probe in self.probes), default=None)
+        return self.next_step
+
+    def sample(self, step):
+        # Record the probes that are due at step, returns the next step at which a probe is due
+        next_step = None
+        for probe in self.probes:
+            if step % probe.interval == 0:
+                probe.record(step)
+            due = step - step % probe.interval + probe.interval
+            next_step = due if next_step is None else min(next_step, due)
+        self.next_step = next_step
+        return next_step
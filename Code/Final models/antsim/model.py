@@ -0,0 +1,183 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - arena and ants                                    ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The agents of the model: the arena (colony, food sources and the pheromone trails)
+## and the individual ants. They used to live in final_with_pheromones.py and
+## final_no_pheromone.py and read the parameters from their module globals, now they get
+## them from the SimulationConfig of the arena, so the model can be imported and run from
+## other code. config.pheromones switches between the two models: without pheromones the
+## arena has no pheromone trails and the ants always do a random walk.
+
+import numpy as np
+
+from .config import SimulationConfig
+from .food import FoodSources
+from .rng import RandomProvider
+from .tables import home_directions, valid_moves
+from .trails import PheromoneTrails
+
+
+# Build different classes which represent different agents of the model.
+# To each agent we attribute characteristis that describe the agent.
+
+####### CLASS 1: ARENA #######
+class Arena:
+    def __init__(self, config = None, rng = None):
+        # Initialise the arena pararmeters
+        self.config = SimulationConfig() if config is None else config  # Parameters of the model, shared with the ants
+        arena_size = self.config.arena_size
+        self.arena_size = arena_size    # Grid size
+        self.colony_size = self.config.colony_size   # Colony size
+        self.pheromones = PheromoneTrails(self.config) if self.config.pheromones else None # Pheromone grid with its diffusion and evaporation (None = model without pheromones, nothing is allocated)
+        self.food_sources = FoodSources(arena_size) # Dictionary-like store of food source positions and values --> store as follows: {(3, 5): 25} = food source at position (3,5) with value 25, also keeps a food grid and the total food left
+        self.food_value = self.config.food_value # Initial value of food source
+        self.rng = RandomProvider() if rng is None else rng # Random number provider of this run, shared with the ants
+        self.valid_moves = valid_moves(arena_size) # Moves that stay inside the arena for every position: self.valid_moves[x][y] = ((dx, dy), ...)
+        self.init_colony() # Initialise the colony area
+        self.init_food_sources(self.config.food_sources) # Place food sources randomly in the arena
+    
+    def init_colony(self): 
+        # Calculate middle index of arena
+        middle = self.arena_size // 2    # Middle sized index for even sized grid
+        col_start = middle - self.colony_size // 2  # Start index (coordinates) of the colony
+        col_end = col_start + self.colony_size      # End index (coordinates) of the colony
+        self.colony_area = [(x,y) for x in range(col_start, col_end) for y in range(col_start, col_end)] # Create list of coordinates that represent the colony area
+        self.home_direction = home_directions(self.arena_size, tuple(self.colony_area)) # Step towards the closest colony cell for every position, computed once per colony layout
+        self.in_colony = np.zeros((self.arena_size, self.arena_size), dtype=bool)   # Boolean mask of the colony area: self.in_colony[position] instead of searching the list
+        self.in_colony[col_start:col_end, col_start:col_end] = True
+    
+    def init_food_sources(self, food_sources):
+        # Randomly place the food sources in the arena 
+        for i in range(food_sources):                       # For every food source (defined earlier), the while loop will be run until it finds a valid position, in which case it will assign the food value
+            while True:                                     # Creates an infinite loop that will keep running until it encounters a 'break'
+                x = self.rng.integers(self.arena_size - 1)    # Generate random x-coordinate ==> since indexing starts at 0, valid indices range from 0 to self.size - 2 (avoid placing on border)
+                y = self.rng.integers(self.arena_size - 1)    # Generate random y-coordinate
+                # Ensure that food source is not randomly placed in the colony area or on another food source
+                if not self.in_colony[x, y] and (x,y) not in self.food_sources:
+                    self.food_sources[(x,y)] = self.food_value
+                    break
+
+    # Pheromone methods, used later on: they pass through to the pheromone trails of the arena (only used when config.pheromones is True)
+    def update_pheromones(self):
+        # Evaporate pheromones by reducing the values based on the previously defined evaporation rate (1 - evaporation_rate = fraction that remains)
+        # and remove pheromones below minimum detectable threshold
+        self.pheromones.update()
+    
+    def get_pheromone_value(self, position):                # Retrieve the current pheromone level at a specific position in the arena grid
+        return self.pheromones.value(position)
+
+    def pheromone_values(self, xs, ys):                     # Same as get_pheromone_value, for arrays of x and y coordinates at once
+        return self.pheromones.values(xs, ys)
+
+    def pheromone_neighbourhoods(self, xs, ys):             # 3x3 pheromone levels around arrays of positions at once (zero outside the arena)
+        return self.pheromones.neighbourhoods(xs, ys)
+
+    def pheromone_levels(self):                             # The whole pheromone grid, up to date (e.g. for plotting)
+        return self.pheromones.levels()
+    
+    def set_pheromone_value(self, position, value):         # Add value to the pheromone concentration at a specific position in the arena grid, capped at pheromone_max
+        self.pheromones.add(position, value)
+
+    def deposit_pheromone(self, position, value):           # Deposit pheromone at a position and let it diffuse to the neighbouring cells
+        self.pheromones.deposit(position, value)
+
+    def deposit_trail(self, path, values):                  # Deposit values[i] at path[i] for a whole path at once, same as deposit_pheromone for every position in turn
+        self.pheromones.deposit_trail(path, values)
+
+####### CLASS 2: ANT #######
+class Ant:
+    def __init__(self, arena):
+        self.arena = arena                                  # Reference to the arena class
+        self.position = self.random_start_position()        # Ant's current position, obtained using function which is defined below
+        self.has_food = False                               # Indicator for whether the ant is carrying food, initializes the has_food attribute to False when the ant is created
+        self.path = []                                      # Path taken by the ant which is used for leaving the pheromones
+
+    def random_start_position(self):                        # Start from a random point within the colony area
+        return self.arena.rng.choice(self.arena.colony_area) # self.arena.colony_area = reference to colony_area attribute of the Arena class
+
+    def move(self):                                         # Decide action based on whether the ant is carrying food
+        if not self.has_food:
+            self.search_for_food()                          # Ant searches for food
+        else:
+            self.return_to_colony()                         # Ant returns to the colony with food
+
+    def search_for_food(self):                              # Movement of ant when looking for food
+        # Check presence of pheromones
+        pheromones = self.arena.pheromones
+        if pheromones is not None and pheromones.value(self.position) >= self.arena.config.pheromone_min_detectable:
+            self.follow_pheromones()                        # Follow pheromone trail
+        else:
+            self.random_walk()                              # If no pheromone (or not detectable, or a model without pheromones), initiate random walk
+        # Check if current position has food source
+        if self.arena.food_sources.take(self.position):    # If ant is on food source and there is food available, take it (decreases food value by 1)
+            self.has_food = True                            # Change has_food attribute to TRUE because ant is now carrying food
+            self.path = [self.position]                     # Start recording path to leave the pheromones
+    
+    def random_walk(self):                                  # Random walk of the ant when no pheromone is detected
+        x, y = self.position
+        direction_x, direction_y = self.arena.rng.choice(self.arena.valid_moves[x][y])  # Choose a random move among the moves that stay inside the arena (precomputed by the arena for every cell, so no redraws at the borders)
+        self.position = (x + direction_x, y + direction_y)  # Update position
+
+    def follow_pheromones(self):                            # Movement of ants based on pheromone level
+        # Ant moves to adjacent cell with highest pheromone value
+        x, y = self.position                                # Ant's current position
+        valid_positions = []                                 # Initialise next positions
+        pheromone_values = []                               # Initialise pheromone values of adjacent cells
+        moves = [(-1, 0), (1, 0), (0, -1), (0, 1),          # Define possible moves
+                 (-1, -1), (-1, 1), (1, -1), (1, 1)]          
+
+        for direction_x, direction_y in moves:              
+            new_x, new_y = x + direction_x, y + direction_y # Movement of ant
+            if 0 <= new_x < self.arena.arena_size and 0 <= new_y < self.arena.arena_size:   # Check if the position is within the arena size
+                valid_positions.append((new_x, new_y))                                      # update the valid positions
+                pheromone_values.append(self.arena.get_pheromone_value((new_x, new_y)))     # update the pheromone values of these positions
+
+        #convert pheromone values to probabilities
+        total_pheromone = sum(pheromone_values)
+        if total_pheromone > 0:                                  # If there are positions with max pheromone level
+            probabilities = [value / total_pheromone for value in pheromone_values]
+        else:                                               # If no positions have pheromone, they all get the same probability
+            probabilities = [1 / len(valid_positions)] * len(valid_positions)
+
+        self.position = self.arena.rng.weighted_choice(valid_positions, probabilities)      # Choose a random position based on the probabilities
+
+
+    def return_to_colony(self):                             # Movement of ant after encountering food source
+        x, y = self.position                                # Ant's current position
+        # Look up the direction towards the closest colony position (Manhattan distance), precomputed by the arena for every cell
+        direction_x, direction_y = self.arena.home_direction[x, y]
+
+        # Calculate the new position by adding direction_x and y to the current position
+        new_x = x + direction_x
+        new_y = y + direction_y
+
+        # Ensure the new position is within the bounds of the arena grid
+        if 0 <= new_x < self.arena.arena_size and 0 <= new_y < self.arena.arena_size:
+            self.position = (new_x, new_y)
+        
+        # Record the current position in the ant's paths for pheromone deposition later
+        self.path.append(self.position)
+
+        # deposit pheromone when going back to the colony, only when ant has food (and in the model with pheromones)
+        if self.has_food == True and self.arena.pheromones is not None:
+            self.leave_pheromone()
+
+        # Check if the ant has reached the colony area
+        if self.arena.in_colony[self.position]:
+            self.has_food = False                           # Ant has delivered the food so has_food is no longer True
+            self.path = []                                  # Reset the path since ant will start new foraging trip
+            self.position = self.random_start_position()    # Start a new search for food from random position is colony
+    
+    def leave_pheromone(self):                           
+        trail_length = len(self.path)                           # Get the total number of positions in the recorded path.
+        if trail_length == 0:                                   # If the path is empty (ant didn't move), no pheromone is deposited.
+            return  # Exit the function.
+        pheromone_values = self.arena.config.pheromone_start * np.exp(-np.arange(trail_length) / trail_length)   # Pheromone value for every position in the path, decreases exponentially as it moves along the path
+        self.arena.deposit_trail(self.path, pheromone_values)  # Deposit and diffuse the pheromone along the whole path at once (values below the detectable threshold are skipped)
+
+    def pheromone_diffusion(self, position, value):
+        # Deposit the pheromone on the position and let it diffuse to the neighbouring cells (each ring of neighbours gets 50% of the previous value, up to diffusion_distance)
+        # The arena's diffusion kernel gives the same result as visiting the neighbours recursively, without revisiting cells one call at a time
+        self.arena.deposit_pheromone(position, value)
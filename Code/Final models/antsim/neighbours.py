@@ -0,0 +1,35 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - pheromone-weighted moves for many ants             ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Ant.follow_pheromones collects the pheromone level of every neighbour inside the arena
+## and picks one with probability proportional to its level. For many ants at once this
+## is done on 3x3 windows of a pheromone grid with a border of zeros around it: the
+## border cells have no pheromone, so they can never be chosen, and no bounds checks are
+## needed. The windows can have any leading shape (ants, or replicates x ants), so this
+## works for every batched representation of the ants.
+
+import numpy as np
+
+from .tables import MOVES
+
+# Position of every move of MOVES in a flattened 3x3 window centred on the ant
+WINDOW_MOVES = (MOVES[:, 0] + 1) * 3 + (MOVES[:, 1] + 1)
+
+
+def pheromone_choice(windows, uniforms):
+    """Pick a move for every window, with probability proportional to the pheromone.
+
+    windows: (..., 3, 3) pheromone levels around the ants, zero outside the arena
+    uniforms: (...) uniform numbers in [0, 1), one per ant
+    Returns (choice, has_pheromone): the index in MOVES of the chosen move, and whether
+    any neighbour has pheromone (if not, choice is meaningless and the ant should pick
+    one of its valid moves uniformly, like Ant.follow_pheromones does).
+    """
+    levels = windows.reshape(windows.shape[:-2] + (9,))[..., WINDOW_MOVES]     # (..., 8) in MOVES order
+    cumulative = np.cumsum(levels, axis=-1)
+    draws = uniforms * cumulative[..., -1]                  # Uniform in [0, total pheromone)
+    # The chosen move is the first one whose cumulative level exceeds the draw (moves without pheromone are skipped)
+    choice = (cumulative <= draws[..., None]).sum(axis=-1)
+    return choice, cumulative[..., -1] > 0
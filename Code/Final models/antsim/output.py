@@ -0,0 +1,139 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - writing results while the runs finish             ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The two result files of an experiment (total steps per run, food left per record, the
+## same .csv files as save_results) are written one run at a time, as soon as the run
+## comes back, instead of from lists of all runs at the end. A crash only loses the runs
+## that were still going, and memory does not grow with the number of runs. Only the main
+## process writes: the worker processes return their results, which arrive in run order
+## (see replicates.py), so the files are never written by two processes at once.
+##
+## The food records of a run are written before its total steps, so a run counts as
+## finished once its line is in the steps file. When the files are opened again with
+## resume=True, food records of unfinished runs are cut off and writing continues after
+## the last finished run (with the same master seed, iter_experiment(..., first_run=...)
+## gives the runs that are missing).
+##
+## With columns_file, the writer also keeps the food tracking of every run as integer
+## columns and stores them as a .npz file (see columnar.py) when it is closed, so the
+## .csv file never has to be parsed again. The .csv files stay the record of what is
+## finished: when resuming, the columns of the finished runs are taken from the .npz file,
+## or read from the .csv file once when the .npz file was not written (e.g. killed process).
+
+import csv
+import os
+
+import numpy as np
+
+from .columnar import FOOD_COLUMNS, csv_columns, load_food_columns, save_food_columns
+
+
+STEPS_HEADER = ['run', 'total_steps']
+FOOD_HEADER = ['run', 'after_nr_steps', 'remaining_food']
+
+
+class ResultWriter:
+    """Appends the rows of every finished run to the steps and food tracking .csv files."""
+
+    def __init__(self, steps_file, food_file, resume=False, columns_file=None, compress=True):
+        # columns_file: also store the food tracking in this .npz file, compress=False to be able to memory-map it
+        self.steps_file = steps_file
+        self.food_file = food_file
+        self.columns_file = columns_file
+        self.compress = compress
+        self.completed = 0                                  # Number of runs in the files (runs are numbered from 1)
+        if resume and os.path.exists(steps_file):
+            self.completed = _truncate_steps(steps_file)
+            if os.path.exists(food_file):
+                _truncate_food(food_file, self.completed)
+        else:
+            for path, header in ((steps_file, STEPS_HEADER), (food_file, FOOD_HEADER)):
+                with open(path, 'w', newline='') as file:
+                    csv.writer(file, lineterminator=os.linesep).writerow(header)
+        self._steps = open(steps_file, 'a', newline='')
+        self._food = open(food_file, 'a', newline='')
+        self._steps_rows = csv.writer(self._steps, lineterminator=os.linesep)
+        self._food_rows = csv.writer(self._food, lineterminator=os.linesep)
+        self._columns = None
+        if columns_file is not None:
+            self._columns = {name: [] for name in FOOD_COLUMNS}    # One array per run (or for all earlier runs)
+            if self.completed:
+                for name, column in _finished_columns(columns_file, food_file, self.completed).items():
+                    self._columns[name].append(column)
+
+    def write(self, total_steps, food_left):
+        # Rows of the next run; returns its run number
+        run = self.completed + 1
+        self._food_rows.writerows((run, record['steps'], record['remaining_food']) for record in food_left)
+        self._food.flush()                                  # Food records on disk before the run counts as finished
+        self._steps_rows.writerow((run, total_steps))
+        self._steps.flush()
+        self.completed = run
+        if self._columns is not None:
+            self._columns['run'].append(np.full(len(food_left), run, dtype=np.int64))
+            self._columns['after_nr_steps'].append(np.fromiter((record['steps'] for record in food_left), np.int64, len(food_left)))
+            self._columns['remaining_food'].append(np.fromiter((record['remaining_food'] for record in food_left), np.int64, len(food_left)))
+        return run
+
+    def write_all(self, results):
+        # Write every (total_steps, food_left) of an iterable of results, returns the number of runs written
+        for total_steps, food_left in results:
+            self.write(total_steps, food_left)
+        return self.completed
+
+    def close(self):
+        self._steps.close()
+        self._food.close()
+        if self._columns is not None:
+            columns = {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64) for name, chunks in self._columns.items()}
+            save_food_columns(self.columns_file, columns, self.compress)
+            self._columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_total_steps(steps_file):
+    # total_steps of every finished run in a steps file, in run order
+    with open(steps_file, newline='') as file:
+        rows = csv.reader(file)
+        next(rows, None)                                    # Header
+        return [int(row[1]) for row in rows if len(row) == 2 and row[1]]
+
+
+def _finished_columns(columns_file, food_file, completed):
+    # Food tracking columns of runs 1 .. completed, from the .npz file if there is one, else from the (truncated) .csv file
+    if os.path.exists(columns_file):
+        columns = load_food_columns(columns_file, mmap=False)
+        finished = columns['run'] <= completed
+        return {name: np.asarray(columns[name], dtype=np.int64)[finished] for name in FOOD_COLUMNS}
+    return csv_columns(food_file)
+
+
+def _truncate_steps(steps_file):
+    # Cut off a line that was not finished, returns the number of finished runs
+    with open(steps_file, 'rb+') as file:
+        lines = file.read().splitlines(keepends=True)
+        if lines and not lines[-1].endswith(b'\n'):
+            file.truncate(sum(len(line) for line in lines[:-1]))
+            lines.pop()
+    return max(len(lines) - 1, 0)                           # Without the header
+
+
+def _truncate_food(food_file, completed):
+    # Cut off the food records of runs after the last finished run (and a line that was not finished)
+    keep = 0
+    with open(food_file, 'rb+') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            run = line.split(b',', 1)[0]
+            if keep and run.isdigit() and int(run) > completed:
+                break
+            keep += len(line)                               # The header is always kept
+        file.truncate(keep)
@@ -0,0 +1,166 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - pheromone evaporation                             ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Arena.update_pheromones multiplies the whole pheromone grid by (1 - evaporation_rate)
+## and sets everything below the detection threshold to zero, every step. Only the cells
+## around the trails have pheromone, so on large arenas most of that work is done on
+## zeros. TileEvaporation splits the arena into square tiles, remembers which tiles got
+## pheromone since they were last empty, and only evaporates those. When most tiles are
+## active it evaporates the whole grid at once instead. Evaporating a zero cell leaves
+## it at zero, so both give exactly the same grid as DenseEvaporation.
+##
+## LazyEvaporation does no work per step at all: it counts the steps and remembers,
+## for every cell, up to which step its value has been evaporated. A cell catches up on
+## the missed steps only when it is read or written, one multiplication and threshold
+## per step exactly like the dense update, so the values (including the cut to zero
+## below pheromone_min_detectable) are the same. A cell with pheromone reaches zero after
+## a few dozen steps, so catching up is bounded however long the cell was not touched.
+##
+## The arena tells the evaporation where pheromone was deposited with mark(), and brings
+## cells up to date with refresh_cell() / refresh() before reading or writing them.
+
+import numpy as np
+
+
+class DenseEvaporation:
+    """Evaporate the whole pheromone grid every step."""
+
+    def __init__(self, evaporation_rate, pheromone_min_detectable):
+        self.evaporation_rate = evaporation_rate                    # Proportion of the pheromone that evaporates per step
+        self.pheromone_min_detectable = pheromone_min_detectable    # Pheromone below this value is removed
+
+    def mark(self, position, radius=0):
+        # Pheromone was deposited within radius cells of position (nothing to remember here)
+        pass
+
+    def mark_path(self, positions, radius=0):
+        # Same as mark, for an (n, 2) array of positions
+        pass
+
+    def refresh_cell(self, grid, x, y):
+        # Bring one cell up to date before it is read or written (always up to date here)
+        pass
+
+    def refresh(self, grid, index):
+        # Same for the cells grid[index] (index arrays or slices)
+        pass
+
+    def refresh_windows(self, grid, xs, ys, radius):
+        # Same for the squares of radius cells around the positions (xs, ys)
+        pass
+
+    def evaporate(self, grid):
+        grid *= (1 - self.evaporation_rate)                         # Fraction that remains
+        grid[grid < self.pheromone_min_detectable] = 0              # Remove pheromones below the detection threshold
+
+
+class TileEvaporation(DenseEvaporation):
+    """Evaporate only the tiles of the arena that have pheromone."""
+
+    def __init__(self, arena_size, evaporation_rate, pheromone_min_detectable, tile_size=16, dense_fraction=0.5):
+        super().__init__(evaporation_rate, pheromone_min_detectable)
+        self.tile_size = tile_size                                  # Width of a square tile in cells
+        self.dense_fraction = dense_fraction                        # Evaporate the whole grid when more than this fraction of tiles is active
+        self.arena_size = arena_size
+        tiles = -(-arena_size // tile_size)                         # Number of tiles per side (the last one can be smaller)
+        self.active = np.zeros((tiles, tiles), dtype=bool)          # Tiles that may have pheromone
+        self.starts = np.arange(0, arena_size, tile_size)           # First cell of every tile, per side
+
+    def mark(self, position, radius=0):
+        # Activate all tiles that overlap the square of radius cells around position
+        x, y = position
+        t = self.tile_size
+        last = self.arena_size - 1
+        self.active[max(x - radius, 0) // t:min(x + radius, last) // t + 1,
+                    max(y - radius, 0) // t:min(y + radius, last) // t + 1] = True
+
+    def mark_path(self, positions, radius=0):
+        # Activate the tiles around every position, all at once
+        t = self.tile_size
+        low = np.maximum(positions - radius, 0) // t                # Tiles of the corners of the squares around the positions
+        high = np.minimum(positions + radius, self.arena_size - 1) // t
+        if radius >= t:                                             # Squares can span more than 2 tiles per side
+            for position in positions:
+                self.mark(position, radius)
+            return
+        for tile_x in (low[:, 0], high[:, 0]):
+            for tile_y in (low[:, 1], high[:, 1]):
+                self.active[tile_x, tile_y] = True
+
+    def evaporate(self, grid):
+        tile_x, tile_y = np.nonzero(self.active)
+        if len(tile_x) == 0:
+            return                                                  # No pheromone anywhere
+        if self.active.size <= 4:
+            # The arena is only a few tiles big: one pass over the grid is cheaper than a loop over tiles
+            super().evaporate(grid)
+            self.active[:] = grid.any()
+            return
+        if len(tile_x) > self.dense_fraction * self.active.size:
+            # Most of the arena has pheromone: evaporate everything and find the tiles that still have some
+            super().evaporate(grid)
+            has_pheromone = grid > 0
+            self.active = np.logical_or.reduceat(np.logical_or.reduceat(has_pheromone, self.starts, axis=0), self.starts, axis=1)
+            return
+        t = self.tile_size
+        for i, j in zip(tile_x, tile_y):
+            tile = grid[i * t:(i + 1) * t, j * t:(j + 1) * t]       # View on the tile, so the grid is updated in place
+            super().evaporate(tile)
+            if not tile.any():
+                self.active[i, j] = False                           # All pheromone of the tile has evaporated
+
+
+class LazyEvaporation(DenseEvaporation):
+    """Evaporate cells only when they are read or written."""
+
+    def __init__(self, arena_size, evaporation_rate, pheromone_min_detectable):
+        super().__init__(evaporation_rate, pheromone_min_detectable)
+        self.step = 0                                               # Number of evaporation steps so far
+        self.updated = np.zeros((arena_size, arena_size), dtype=np.int64)  # Step up to which every cell has been evaporated
+
+    def evaporate(self, grid):
+        self.step += 1                                              # The cells catch up when they are used
+
+    def refresh_cell(self, grid, x, y):
+        steps = self.step - self.updated[x, y]
+        if steps == 0:
+            return
+        value = grid[x, y]
+        while steps > 0 and value > 0:                              # Same multiplication and threshold as the dense update, once per missed step
+            value = value * (1 - self.evaporation_rate)
+            if value < self.pheromone_min_detectable:
+                value = 0
+            steps -= 1
+        grid[x, y] = value
+        self.updated[x, y] = self.step
+
+    def refresh(self, grid, index):
+        steps = self.step - self.updated[index]
+        values = np.array(grid[index], dtype=float)                 # Copy, also when index is a slice
+        pending = (steps > 0) & (values > 0)
+        while pending.any():
+            values[pending] *= (1 - self.evaporation_rate)
+            values[pending & (values < self.pheromone_min_detectable)] = 0
+            steps -= 1
+            pending &= (steps > 0) & (values > 0)
+        grid[index] = values
+        self.updated[index] = self.step
+
+    def refresh_windows(self, grid, xs, ys, radius):
+        offsets = np.arange(-radius, radius + 1)
+        window_x = np.clip(xs[:, None, None] + offsets[None, :, None], 0, grid.shape[0] - 1)
+        window_y = np.clip(ys[:, None, None] + offsets[None, None, :], 0, grid.shape[1] - 1)
+        self.refresh(grid, (window_x, window_y))
+
+
+def make_evaporation(mode, arena_size, evaporation_rate, pheromone_min_detectable):
+    # Evaporation for the arena: 'dense' (whole grid every step), 'tiles' (only tiles with pheromone) or 'lazy' (when cells are used)
+    if mode == 'dense':
+        return DenseEvaporation(evaporation_rate, pheromone_min_detectable)
+    if mode == 'tiles':
+        return TileEvaporation(arena_size, evaporation_rate, pheromone_min_detectable)
+    if mode == 'lazy':
+        return LazyEvaporation(arena_size, evaporation_rate, pheromone_min_detectable)
+    raise ValueError(f"Unknown evaporation mode {mode!r}, use 'dense', 'tiles' or 'lazy'")
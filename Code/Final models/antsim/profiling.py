@@ -0,0 +1,148 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - time per phase of a step                          ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Where does the time of a step go: random walking, following pheromones, returning to
+## the colony, depositing and diffusing pheromone or evaporation? A PhaseProfile replaces
+## the methods of one arena and its ants by timed versions, on those objects only, so
+## runs without a profile run the plain methods and pay nothing. Every phase gets its
+## number of calls, its total time and its own time (without the phases it calls, e.g.
+## search_for_food without follow_pheromones). With profile_file, iter_experiment profiles
+## every run in the worker processes and writes one JSON line per run; read_profile adds
+## them up over all runs.
+
+import json
+import os
+from time import perf_counter
+
+
+# Method of the ants or the arena: name of the phase
+ANT_PHASES = {'search_for_food': 'search_for_food', 'random_walk': 'random_walk', 'follow_pheromones': 'follow_pheromones',
+              'return_to_colony': 'return_to_colony', 'leave_pheromone': 'leave_pheromone'}
+COLONY_PHASES = dict(ANT_PHASES, pick_up_food='pick_up_food')
+ARENA_PHASES = {'update_pheromones': 'update_pheromones', 'deposit_trail': 'pheromone_diffusion',
+                'deposit_pheromone': 'pheromone_diffusion'}
+
+
+class PhaseProfile:
+    """Calls, total time and own time per phase of the instrumented objects."""
+
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+        self.own_seconds = {}
+        self._nested = []                                   # Time spent in nested phases, per phase that is running
+
+    def instrument(self, obj, phases):
+        # Time the methods of obj named in phases ({method: phase}), on this object only
+        for method, phase in phases.items():
+            if hasattr(obj, method):
+                setattr(obj, method, self._timed(phase, getattr(obj, method)))
+
+    def instrument_run(self, arena, ants):
+        # Time the phases of an arena and its ants (a Colony or a list of Ant objects)
+        self.instrument(arena, ARENA_PHASES)
+        if isinstance(ants, list):
+            for ant in ants:
+                self.instrument(ant, ANT_PHASES)
+        else:
+            self.instrument(ants, COLONY_PHASES)
+
+    def _timed(self, phase, function):
+        self.calls.setdefault(phase, 0)
+        self.seconds.setdefault(phase, 0.0)
+        self.own_seconds.setdefault(phase, 0.0)
+        nested = self._nested
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            nested.append(0.0)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                inner = nested.pop()
+                self.calls[phase] += 1
+                self.seconds[phase] += elapsed
+                self.own_seconds[phase] += elapsed - inner
+                if nested:
+                    nested[-1] += elapsed                   # Counts as nested time of the calling phase
+
+        return timed
+
+    def summary(self):
+        # {phase: {'calls', 'seconds', 'own_seconds'}} of the phases that were called
+        return {phase: {'calls': self.calls[phase], 'seconds': self.seconds[phase], 'own_seconds': self.own_seconds[phase]}
+                for phase in self.calls if self.calls[phase]}
+
+
+def aggregate(summaries):
+    # Sum of summaries (e.g. of all runs of an experiment)
+    total = {}
+    for summary in summaries:
+        for phase, numbers in summary.items():
+            entry = total.setdefault(phase, {'calls': 0, 'seconds': 0.0, 'own_seconds': 0.0})
+            for key in entry:
+                entry[key] += numbers[key]
+    return total
+
+
+class ProfileWriter:
+    """Appends the profile of every finished run as one JSON line."""
+
+    def __init__(self, path, first_run=0):
+        # first_run = 0 starts a new file, otherwise the runs before first_run are kept
+        kept = []
+        if first_run and os.path.exists(path):
+            kept = [record for record in _read_lines(path) if record['run'] < first_run]
+        self._file = open(path, 'w')
+        for record in kept:
+            self.write_record(record)
+
+    def write(self, run, profile):
+        self.write_record(dict(run=run, **profile))
+
+    def write_record(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_lines(path):
+    records = []
+    with open(path) as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:                    # Last line cut off by an interruption
+                continue
+    return records
+
+
+def read_profile(path):
+    """(runs, total) of a profile file: the record of every run and the phases summed over all runs.
+
+    Every record has the run, its total_steps, its seconds and its phases.
+    """
+    runs = _read_lines(path)
+    return runs, aggregate(record['phases'] for record in runs)
+
+
+def format_profile(phases, total_seconds=None):
+    # Table of phases (a summary or aggregate), the phase with the most own time first
+    lines = [f"{'phase':<20}{'calls':>12}{'seconds':>12}{'own seconds':>14}{'us/call':>10}" + ("{:>8}".format('own %') if total_seconds else '')]
+    for phase, numbers in sorted(phases.items(), key=lambda item: -item[1]['own_seconds']):
+        line = f"{phase:<20}{numbers['calls']:>12}{numbers['seconds']:>12.3f}{numbers['own_seconds']:>14.3f}{1e6 * numbers['seconds'] / numbers['calls']:>10.1f}"
+        if total_seconds:
+            line += f"{100 * numbers['own_seconds'] / total_seconds:>8.1f}"
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,207 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - drawing the arena                                 ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Two ways to turn the arena into animation frames. ArenaRenderer draws with matplotlib
+## like plot_arena in the model scripts, but makes the colony, food, ants, pheromone image
+## and legend only once and then only changes their data every frame (set_offsets,
+## set_data); animate_arena draws the axes, ticks and title once and only the arena on
+## top of them every frame (blitting). rasterise() does not use matplotlib at all: it
+## colours the cells of an RGB array straight from the food, ant and pheromone arrays.
+## FrameWriter writes the frames as a GIF (Pillow) or an MP4 (ffmpeg). Both use the
+## same picture as plot_arena: the first coordinate of a position is vertical (from the
+## bottom), the second horizontal, and the pheromone colours are scaled to the lowest and
+## highest level of the frame. matplotlib and Pillow are imported only when they are used.
+
+import os
+import subprocess
+
+import numpy as np
+
+from .metrics import ant_positions
+
+
+def food_positions(arena):
+    # (n, 2) positions of the food sources that still have food
+    cells = np.argwhere(arena.food_sources.grid > 0)
+    return cells if len(cells) else np.empty((0, 2), dtype=np.int64)
+
+
+class ArenaRenderer:
+    """matplotlib artists of one arena, made once and updated in place every frame."""
+
+    def __init__(self, ax, arena, ants, title):
+        self.ax = ax
+        self.arena = arena
+        self.ants = ants
+        ax.set_title(title)
+        if arena.pheromones is not None:
+            levels = arena.pheromone_levels()
+            self.image = ax.imshow(levels, cmap="plasma", origin="lower", alpha=0.5, interpolation="nearest")
+        else:
+            self.image = None
+        ax.set_xlim(0, arena.arena_size)
+        ax.set_ylim(0, arena.arena_size)
+        colony_x, colony_y = zip(*arena.colony_area)
+        self.colony = ax.scatter(colony_x, colony_y, c='blue', s=200, label="Colony", marker='s')
+        self.food = ax.scatter([], [], c='green', s=100, label="Food", marker='o')
+        self.ant_markers = ax.scatter([], [], c='red', s=50, label="Ants", marker=(5, 1))
+        self.legend = ax.legend(loc="upper right")
+        # Everything inside the axes, in drawing order (the pheromone image covers the whole arena, so the colony and legend are drawn again after it)
+        self.artists = tuple(artist for artist in (self.image, self.colony, self.food, self.ant_markers, self.legend) if artist is not None)
+        self.update()
+
+    def update(self):
+        # Move the artists to the current state, returns all artists inside the axes (for blitting)
+        self.food.set_offsets(food_positions(self.arena)[:, ::-1])  # Second coordinate horizontal, as in plot_arena
+        self.ant_markers.set_offsets(ant_positions(self.ants)[:, ::-1])
+        if self.image is not None:
+            levels = self.arena.pheromone_levels()
+            self.image.set_data(levels)
+            self.image.set_clim(levels.min(), levels.max()) # Colours scaled per frame, like a new imshow
+        return self.artists
+
+
+def blit_frames(renderer, step, steps):
+    """Yield the RGB frame (a copy) after each of steps calls of step(), drawn with blitting.
+
+    The figure without the arena (axes, ticks, title) is drawn once; every frame only the
+    artists of the renderer are drawn on a copy of it.
+    """
+    ax = renderer.ax
+    canvas = ax.figure.canvas
+    for artist in renderer.artists:
+        artist.set_animated(True)                           # Left out of the background
+    canvas.draw()
+    background = canvas.copy_from_bbox(ax.figure.bbox)
+    try:
+        for _ in range(steps):
+            step()
+            canvas.restore_region(background)
+            for artist in renderer.update():
+                ax.draw_artist(artist)
+            yield np.asarray(canvas.buffer_rgba())[..., :3].copy()
+    finally:
+        for artist in renderer.artists:
+            artist.set_animated(False)
+
+
+def animate_arena(arena, ants, step, steps, filename, title, fps=5, show=True):
+    """Animate steps calls of step() with an ArenaRenderer and save it as a GIF or MP4 (see blit_frames)."""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(8, 8))
+    renderer = ArenaRenderer(ax, arena, ants, title)
+    with FrameWriter(filename, fps) as writer:
+        for frame in blit_frames(renderer, step, steps):
+            writer.add(frame)
+    if show:
+        plt.show()                                          # The last frame
+    else:
+        plt.close(fig)
+
+
+# Colours of the matplotlib 'plasma' colour map at 0, 0.25, 0.5, 0.75 and 1
+PLASMA = np.array([[13, 8, 135], [126, 3, 168], [204, 71, 120], [248, 149, 64], [240, 249, 33]], dtype=np.float64)
+WHITE = np.array([255, 255, 255], dtype=np.float64)
+COLONY = np.array([0, 0, 255], dtype=np.uint8)
+FOOD = np.array([0, 128, 0], dtype=np.uint8)
+ANT = np.array([255, 0, 0], dtype=np.uint8)
+
+
+def _colour_map(values):
+    # RGB of values in [0, 1] on the plasma colour map, linear between the anchor colours
+    position = values * (len(PLASMA) - 1)
+    low = np.minimum(position.astype(np.int64), len(PLASMA) - 2)
+    fraction = (position - low)[..., None]
+    return PLASMA[low] * (1 - fraction) + PLASMA[low + 1] * fraction
+
+
+def rasterise(arena, ants, levels=None, food=None, positions=None):
+    """RGB frame (uint8, one pixel per position) of the arena, without matplotlib.
+
+    levels, food and positions replace the pheromone grid, the food grid and the ant
+    positions of the arena (e.g. from a recorded run); by default they are read from the arena.
+    """
+    size = arena.arena_size
+    if levels is None and arena.pheromones is not None:
+        levels = arena.pheromone_levels()
+    if levels is not None:
+        low, high = levels.min(), levels.max()
+        scaled = (levels - low) / (high - low) if high > low else np.zeros_like(levels)
+        colours = 0.5 * _colour_map(scaled) + 0.5 * WHITE   # alpha=0.5 on a white background, as in plot_arena
+    else:
+        colours = np.broadcast_to(WHITE, (size, size, 3))
+    frame = colours.astype(np.uint8)
+    colony = np.array(arena.colony_area)
+    frame[colony[:, 0], colony[:, 1]] = COLONY
+    food = arena.food_sources.grid if food is None else food
+    frame[food > 0] = FOOD
+    positions = ant_positions(ants) if positions is None else positions
+    frame[positions[:, 0], positions[:, 1]] = ANT
+    return frame[::-1]                                      # First coordinate from the bottom up
+
+
+def render_frames(arena, ants, step, steps, filename, fps=5, cell=16):
+    # Same as animate_arena, but rasterised without matplotlib
+    with FrameWriter(filename, fps) as writer:
+        for _ in range(steps):
+            step()
+            writer.add(_enlarge(rasterise(arena, ants), cell))
+
+
+def _enlarge(frame, cell):
+    # Every pixel as a cell x cell block
+    return np.repeat(np.repeat(frame, cell, axis=0), cell, axis=1)
+
+
+class FrameWriter:
+    """Collects RGB frames for a GIF (needs Pillow) or sends them to ffmpeg for an MP4 (needs ffmpeg on the path)."""
+
+    def __init__(self, filename, fps=5):
+        self.filename = filename
+        self.fps = fps
+        self.gif = os.path.splitext(filename)[1].lower() == '.gif'
+        self.images = []                                    # GIF frames, with a palette of 256 colours (a quarter of the size of RGBA)
+        self.ffmpeg = None
+
+    def add(self, frame):
+        # Add an RGB frame (or, for a GIF, a frame already converted with gif_frame)
+        if self.gif:
+            self.images.append(frame if hasattr(frame, 'palette') else gif_frame(frame))
+            return
+        if self.ffmpeg is None:
+            height, width = frame.shape[:2]
+            command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+                       '-r', str(self.fps), '-i', '-', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', self.filename]
+            self.ffmpeg = subprocess.Popen(command, stdin=subprocess.PIPE)  # Frames are sent as raw RGB through a pipe
+        self.ffmpeg.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        if self.gif and self.images:
+            self.images[0].save(self.filename, save_all=True, append_images=self.images[1:], duration=round(1000 / self.fps), loop=0)
+            self.images = []
+        elif self.ffmpeg is not None:
+            self.ffmpeg.stdin.close()
+            if self.ffmpeg.wait():
+                raise RuntimeError(f"ffmpeg could not write {self.filename}")
+            self.ffmpeg = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def gif_frame(frame):
+    # RGB frame as a Pillow image with a palette of 256 colours, as stored in a GIF
+    from PIL import Image
+    return Image.fromarray(np.ascontiguousarray(frame)).quantize(method=Image.Quantize.FASTOCTREE)
+
+
+def save_frames(frames, filename, fps=5, cell=16):
+    # Write RGB frames (e.g. from rasterise) as a GIF or MP4, every pixel enlarged to cell x cell pixels
+    with FrameWriter(filename, fps) as writer:
+        for frame in frames:
+            writer.add(_enlarge(frame, cell))
@@ -0,0 +1,59 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - parallel replicates                               ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Every replicate of an experiment is independent, so they can be spread over a pool of
+## worker processes. Each run gets its own random stream, spawned from one master seed
+## by run number, so the results do not depend on how many workers are used or on which
+## worker picks up which run. Results always come back in run order. A caller that runs
+## many small parts one after the other (see adaptive.py) can pass one executor for all of
+## them, so the worker processes are started only once.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .rng import RandomProvider
+
+
+def replicate_seeds(runs, seed=None):
+    # One independent seed per run, derived from the master seed (None = fresh entropy)
+    return np.random.SeedSequence(seed).spawn(runs)
+
+
+def seed_replicate(seed):
+    # Random number provider for one run, to be shared by everything that draws in that run
+    return RandomProvider(seed)
+
+
+def iter_replicates(replicate, runs, workers=None, seed=None, first_run=0, executor=None):
+    """Yield replicate(run, seed) for run = first_run .. first_run + runs - 1, in run order.
+
+    replicate must be a module-level function so it can be sent to the worker processes.
+    workers = None uses all cores, workers = 1 runs everything in the current process.
+    Run r always gets the same seed, so the runs can also be done in several parts.
+    executor: an open ProcessPoolExecutor to use instead of starting a new one (workers
+    is then only used to hand out the runs).
+    """
+    seeds = replicate_seeds(first_run + runs, seed)[first_run:]
+    run_numbers = range(first_run, first_run + runs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, runs)
+    if workers <= 1 and (executor is None or runs == 0):
+        for run, run_seed in zip(run_numbers, seeds):
+            yield replicate(run, run_seed)
+        return
+    chunksize = max(1, runs // (workers * 4))               # Hand out runs in small chunks so slow runs do not stall a worker
+    if executor is not None:
+        yield from executor.map(replicate, run_numbers, seeds, chunksize=chunksize)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(replicate, run_numbers, seeds, chunksize=chunksize)
+
+
+def run_replicates(replicate, runs, workers=None, seed=None):
+    # Same as iter_replicates, but collect all results in a list
+    return list(iter_replicates(replicate, runs, workers, seed))
@@ -0,0 +1,72 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - batched random numbers                            ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Every ant decision used to call into Python's random module (random.choice,
+## random.choices, random.randint), once or more per ant per step. RandomProvider draws
+## uniforms from a NumPy Generator in large blocks and hands them out one at a time (for
+## the per-ant code) or as array slices (for the colony engine), so the cost of a draw is
+## mostly a list lookup. One provider is one seedable stream: give every replicate its
+## own provider, shared by its arena and ants, and the run is reproducible.
+
+from bisect import bisect
+from itertools import accumulate
+
+import numpy as np
+
+
+class RandomProvider:
+    """Block-buffered random numbers from one NumPy Generator."""
+
+    def __init__(self, seed=None, block_size=4096):
+        self.generator = np.random.default_rng(seed)        # Seed can be an int, a SeedSequence or None (fresh entropy)
+        self.block_size = block_size                        # Number of uniforms drawn from the generator at once
+        self._block = np.empty(0)                           # Current block of uniforms in [0, 1)
+        self._values = []                                   # Same block as a list, for fast single draws
+        self._next = 0                                      # Position of the next unused uniform in the block
+
+    def _refill(self, n):
+        # Start a new block with at least n uniforms (the rest of the old block is dropped)
+        self._block = self.generator.random(max(self.block_size, n))
+        self._values = self._block.tolist()
+        self._next = 0
+
+    def random(self, size=None):
+        # One uniform in [0, 1) as a float, or an array of size uniforms
+        if size is None:
+            i = self._next
+            if i >= len(self._values):
+                self._refill(1)
+                i = 0
+            self._next = i + 1
+            return self._values[i]
+        if self._next + size > len(self._values):
+            self._refill(size)
+        values = self._block[self._next:self._next + size]
+        self._next += size
+        return values
+
+    # A uniform u in [0, 1) has 53 random bits, so int(u * n) is always below n
+
+    def integers(self, high, size=None):
+        # Uniform integer(s) in range(high); high can also be an array with one bound per draw
+        if size is None and not isinstance(high, np.ndarray):
+            return int(self.random() * high)
+        if size is None:
+            size = len(high)
+        return (self.random(size) * high).astype(np.int64)
+
+    def choice(self, sequence):
+        # Same as random.choice: one element, all equally likely (the hottest draw, so random() is inlined)
+        i = self._next
+        if i >= len(self._values):
+            self._refill(1)
+            i = 0
+        self._next = i + 1
+        return sequence[int(self._values[i] * len(sequence))]
+
+    def weighted_choice(self, population, weights):
+        # Same as random.choices(population, weights, k=1)[0]: one element, chosen with probability proportional to its weight
+        cumulative = list(accumulate(weights))
+        return population[bisect(cumulative, self.random() * cumulative[-1], 0, len(cumulative) - 1)]
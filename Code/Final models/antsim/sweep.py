@@ -0,0 +1,135 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - parameter sweeps                                  ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## A sweep runs the same number of replicates for many configurations, e.g. every
+## combination of arena_size, ants and pheromones. All (configuration, run) tasks go into
+## one pool of worker processes, the most expensive first (large arenas take far longer),
+## and every worker picks up the next task as soon as it is free, so the pool stays busy
+## until the end. Every finished task is appended to a checkpoint file right away; when
+## the sweep is started again with the same checkpoint, the tasks in it are not run
+## again. Run r of a configuration gets the same seed as run r of run_experiment with the
+## same master seed, so a sweep gives the same results as running the configurations one
+## by one.
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from itertools import product
+
+import numpy as np
+
+from .config import SimulationConfig
+from .experiment import run_replicate
+from .replicates import replicate_seeds
+
+
+def sweep_grid(base=None, **axes):
+    """All combinations of the values of axes, as configurations derived from base.
+
+    sweep_grid(arena_size=[20, 50], pheromones=[True, False]) gives 4 configurations.
+    """
+    base = SimulationConfig() if base is None else base
+    names = list(axes)
+    return [base.replace(**dict(zip(names, values))) for values in product(*(axes[name] for name in names))]
+
+
+def config_key(config):
+    # Text that identifies a configuration in the checkpoint file
+    return json.dumps(asdict(config), sort_keys=True)
+
+
+def estimated_cost(config):
+    # Relative run time of one replicate: the ants search an area of arena_size ** 2 for the food
+    return config.arena_size ** 2 * config.food_sources * config.food_value
+
+
+def read_checkpoint(checkpoint):
+    # (master seed, {(config key, run): (total_steps, food_left)}) from a checkpoint file
+    seed = None
+    done = {}
+    with open(checkpoint) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:                    # Last line cut off by an interruption
+                continue
+            if 'seed' in record:
+                seed = record['seed']
+                continue
+            food_left = [{'steps': steps, 'remaining_food': food} for steps, food in record['food_left']]
+            done[(record['config'], record['run'])] = (record['total_steps'], food_left)
+    return seed, done
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b'\n'
+
+
+def _run_task(config, run, seed):
+    # One replicate of a sweep (module level for the worker processes)
+    return config, run, run_replicate(config, seed)
+
+
+def run_sweep(configs, runs, checkpoint=None, workers=None, seed=None):
+    """Run runs replicates of every configuration, returns {config: [(total_steps, food_left), ...]}.
+
+    checkpoint: file to which every finished replicate is appended. Tasks already in it
+    are not run again, so an interrupted sweep continues where it stopped.
+    workers = None uses all cores, workers = 1 runs everything in the current process.
+    seed is the master seed (None = fresh entropy, stored in the checkpoint for resuming).
+    """
+    configs = list(dict.fromkeys(configs))                  # Each configuration once, in the given order
+    done = {}
+    if checkpoint is not None and os.path.exists(checkpoint):
+        stored_seed, done = read_checkpoint(checkpoint)
+        if stored_seed is not None:
+            if seed is not None and seed != stored_seed:
+                raise ValueError(f"Checkpoint {checkpoint} was made with seed {stored_seed}, not {seed}")
+            seed = stored_seed
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)        # Fresh entropy, remembered so the sweep can be resumed
+    seeds = replicate_seeds(runs, seed)
+
+    keys = {config: config_key(config) for config in configs}
+    tasks = [(config, run) for config in configs for run in range(runs) if (keys[config], run) not in done]
+    tasks.sort(key=lambda task: -estimated_cost(task[0]))   # Longest tasks first, the short ones fill the gaps at the end
+
+    log = None
+    if checkpoint is not None:
+        new_file = not os.path.exists(checkpoint) or os.path.getsize(checkpoint) == 0
+        log = open(checkpoint, 'a')
+        if new_file:
+            log.write(json.dumps({'seed': seed}) + '\n')
+        elif not _ends_with_newline(checkpoint):
+            log.write('\n')                                 # Do not continue a line cut off by an interruption
+
+    def finish(config, run, result):
+        done[(keys[config], run)] = result
+        if log is not None:
+            total_steps, food_left = result
+            record = {'config': keys[config], 'run': run, 'total_steps': total_steps,
+                      'food_left': [[entry['steps'], entry['remaining_food']] for entry in food_left]}
+            log.write(json.dumps(record) + '\n')
+            log.flush()                                     # On disk before the next task finishes
+
+    try:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(tasks) <= 1:
+            for config, run in tasks:
+                finish(config, run, run_replicate(config, seeds[run]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_run_task, config, run, seeds[run]) for config, run in tasks]
+                for future in as_completed(futures):
+                    finish(*future.result())
+    finally:
+        if log is not None:
+            log.close()
+
+    return {config: [done[(keys[config], run)] for run in range(runs)] for config in configs}
@@ -0,0 +1,67 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - precomputed arena tables                          ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## The colony and the arena borders never change during a run, so everything the ants
+## derive from them can be computed once per arena layout and looked up per cell.
+## The tables are cached on the layout, so the replicates of an experiment share them.
+## They are returned read-only because they are shared.
+
+from functools import lru_cache
+
+import numpy as np
+
+# Possible moves of an ant, in the same order as in Ant.follow_pheromones
+MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1),
+                  (-1, -1), (-1, 1), (1, -1), (1, 1)])
+
+
+@lru_cache(maxsize=None)
+def home_directions(arena_size, colony_area):
+    """Step (direction_x, direction_y) towards the closest colony cell, for every cell.
+
+    Same rule as Ant.return_to_colony: the closest colony cell by Manhattan distance,
+    the first one in colony_area when several are equally close. colony_area must be
+    a tuple of (x, y) positions so it can be cached.
+    """
+    colony = np.array(colony_area)
+    directions = np.zeros((arena_size, arena_size, 2), dtype=np.int64)
+    y = np.arange(arena_size)
+    for x in range(arena_size):                                     # One row at a time to keep the distance matrix small on large arenas
+        distances = np.abs(colony[None, :, 0] - x) + np.abs(colony[None, :, 1] - y[:, None])
+        closest = colony[np.argmin(distances, axis=1)]              # argmin returns the first colony cell on ties
+        directions[x, :, 0] = np.sign(closest[:, 0] - x)
+        directions[x, :, 1] = np.sign(closest[:, 1] - y)
+    directions.flags.writeable = False
+    return directions
+
+
+@lru_cache(maxsize=None)
+def move_table(arena_size):
+    """Moves that stay inside the arena, for every cell.
+
+    Returns (table, counts): table[x, y, :counts[x, y]] are the indices in MOVES of the
+    valid moves from (x, y), in MOVES order (the rest of the row is padding).
+    Picking table[x, y, k] with k uniform in range(counts[x, y]) gives the same
+    distribution as drawing moves until one stays inside the arena.
+    """
+    cells = np.arange(arena_size)
+    new_x = cells[:, None, None] + MOVES[None, None, :, 0]
+    new_y = cells[None, :, None] + MOVES[None, None, :, 1]
+    valid = (new_x >= 0) & (new_x < arena_size) & (new_y >= 0) & (new_y < arena_size)     # (arena_size, arena_size, 8)
+    counts = valid.sum(axis=2)
+    # Stable sort puts the valid moves first, in MOVES order
+    table = np.argsort(~valid, axis=2, kind='stable')
+    table.flags.writeable = False
+    counts.flags.writeable = False
+    return table, counts
+
+
+@lru_cache(maxsize=None)
+def valid_moves(arena_size):
+    # Same as move_table, as nested tuples for the per-ant code: valid_moves(size)[x][y] = ((dx, dy), ...)
+    table, counts = move_table(arena_size)
+    moves = [tuple(int(v) for v in move) for move in MOVES]
+    return tuple(tuple(tuple(moves[k] for k in table[x, y, :counts[x, y]]) for y in range(arena_size))
+                 for x in range(arena_size))
@@ -0,0 +1,213 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - recording runs to animate them later              ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Instead of running the simulation inside the animation (so a crash while drawing loses
+## the run, and the simulation waits for every frame to be drawn), a run can be recorded
+## as a trace and animated afterwards. A TraceRecorder is a probe (see metrics.py) that
+## records every step: the ant positions (int16), the food left at every food source and
+## only the pheromone cells that changed since the previous step, with their new level.
+## Trace.replay rebuilds the arena step by step from that, and render_trace draws any
+## range of steps, optionally spread over worker processes (every worker replays its own
+## part of the trace). With trace_dir, iter_experiment stores the trace of every run of an
+## experiment, so any replicate of a parallel experiment can be animated after the fact.
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from itertools import repeat
+
+import numpy as np
+
+from .metrics import Probe, RingBuffer, ant_positions
+
+
+class TraceRecorder(Probe):
+    """Records the ants, food and pheromone changes of every step of a run."""
+
+    name = 'trace'
+
+    def __init__(self, capacity=1024):
+        super().__init__(interval=1, capacity=capacity, overwrite=False)
+
+    def bind(self, arena, ants):
+        self.arena = arena
+        self.ants = ants
+        self.food_cells = np.array(list(arena.food_sources), dtype=np.int64).reshape(-1, 2)
+        self.positions = RingBuffer(self.capacity, (len(ant_positions(ants)), 2), np.int16, overwrite=False)
+        self.food = RingBuffer(self.capacity, (len(self.food_cells),), np.int16, overwrite=False)
+        size = arena.arena_size
+        self.previous = np.zeros((size, size))              # Pheromone levels of the previous step
+        self.changed = np.zeros((size, size), dtype=bool)   # Reused for every step
+        self.cells, self.values, self.counts = [], [], []
+        self.record(0)                                      # The start of the run
+
+    def record(self, step):
+        i = self.positions.slot(step)
+        self.positions.values[i] = ant_positions(self.ants)
+        i = self.food.slot(step)
+        self.food.values[i] = self.arena.food_sources.grid[self.food_cells[:, 0], self.food_cells[:, 1]]
+        if self.arena.pheromones is None:
+            self.counts.append(0)
+            return
+        levels = self.arena.pheromone_levels()
+        np.not_equal(levels, self.previous, out=self.changed)
+        cells = np.flatnonzero(self.changed)
+        self.previous.flat[cells] = levels.flat[cells]
+        self.cells.append(cells.astype(np.int32))
+        self.values.append(levels.flat[cells].astype(np.float32))
+        self.counts.append(len(cells))
+
+    def records(self):
+        return self.trace()
+
+    def trace(self):
+        # The recorded run as a Trace
+        arena = self.arena
+        empty = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+        return Trace(arena_size=arena.arena_size,
+                     colony_area=np.array(arena.colony_area, dtype=np.int16),
+                     food_cells=self.food_cells.astype(np.int16),
+                     positions=self.positions.records()[1],
+                     food=self.food.records()[1],
+                     pheromone_starts=np.concatenate([[0], np.cumsum(self.counts)]).astype(np.int64),
+                     pheromone_cells=np.concatenate(self.cells or [empty[0]]),
+                     pheromone_values=np.concatenate(self.values or [empty[1]]),
+                     pheromones=arena.pheromones is not None,
+                     config=json.dumps(asdict(arena.config)))
+
+
+class Trace:
+    """A recorded run: state i of the arrays is the arena after i steps (0 = the start)."""
+
+    def __init__(self, arena_size, colony_area, food_cells, positions, food, pheromone_starts,
+                 pheromone_cells, pheromone_values, pheromones, config):
+        self.arena_size = int(arena_size)
+        self.colony_area = colony_area
+        self.food_cells = food_cells                        # (n_sources, 2) position of every food source
+        self.positions = positions                          # (steps + 1, n_ants, 2) int16
+        self.food = food                                    # (steps + 1, n_sources) food left per source
+        self.pheromone_starts = pheromone_starts            # Changes of state i: pheromone_cells[starts[i]:starts[i + 1]]
+        self.pheromone_cells = pheromone_cells              # Flat index of every changed cell
+        self.pheromone_values = pheromone_values            # New level of every changed cell
+        self.pheromones = bool(pheromones)
+        self.config = config                                # SimulationConfig of the run, as JSON
+
+    def __len__(self):
+        return len(self.positions)                          # Number of states (steps + 1)
+
+    def save(self, path):
+        np.savez_compressed(path, **vars(self))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            fields = {name: data[name] for name in data.files}
+        fields['config'] = str(fields['config'])
+        return cls(**fields)
+
+    def replay(self):
+        # A ReplayState at the start of the run, to move through the trace with seek
+        return ReplayState(self)
+
+
+class ReplayState:
+    """The arena and ants of one state of a trace, with the attributes the renderers read."""
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.arena_size = trace.arena_size
+        self.colony_area = [tuple(cell) for cell in trace.colony_area.tolist()]
+        self.pheromones = True if trace.pheromones else None
+        self.food_sources = _FoodGrid(trace.arena_size)
+        self.levels = np.zeros((trace.arena_size, trace.arena_size))
+        self.index = -1
+        self.seek(0)
+
+    def seek(self, index):
+        # Move to state index (forwards applies only the changes in between)
+        trace = self.trace
+        if index < self.index:
+            self.levels[:] = 0
+            self.index = -1
+        starts = trace.pheromone_starts
+        for state in range(self.index + 1, index + 1):     # In order: a later change of a cell overwrites an earlier one
+            changes = slice(starts[state], starts[state + 1])
+            self.levels.flat[trace.pheromone_cells[changes]] = trace.pheromone_values[changes]
+        self.index = index
+        self.positions = trace.positions[index].astype(np.int64)
+        self.food_sources.grid[:] = 0
+        self.food_sources.grid[trace.food_cells[:, 0], trace.food_cells[:, 1]] = trace.food[index]
+
+    def pheromone_levels(self):
+        return self.levels
+
+
+class _FoodGrid:
+    # Stands in for arena.food_sources (the renderers only read its grid)
+    def __init__(self, arena_size):
+        self.grid = np.zeros((arena_size, arena_size), dtype=np.int64)
+
+
+def save_trace(config, seed, path):
+    # Run one replicate with a TraceRecorder and store its trace, returns (total_steps, food_left)
+    from .experiment import run_replicate
+    from .metrics import Metrics
+    recorder = TraceRecorder()
+    result = run_replicate(config, seed, Metrics(recorder))
+    recorder.trace().save(path)
+    return result
+
+
+def _render_part(trace, start, stop, rasterised, cell, title, gif):
+    # Frames of states start .. stop - 1 (module level for the worker processes), converted for a GIF when gif is True
+    from .render import _enlarge, blit_frames, gif_frame, rasterise
+    state = trace.replay()
+    state.seek(start)
+    if rasterised:
+        frames = (_enlarge(rasterise(state, state), cell) for _ in map(state.seek, range(start, stop)))
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from .render import ArenaRenderer
+        figure = Figure(figsize=(8, 8))                     # Without pyplot: no window, also in the worker processes
+        FigureCanvasAgg(figure)
+        renderer = ArenaRenderer(figure.add_subplot(), state, state, title)
+        indices = iter(range(start, stop))
+        frames = blit_frames(renderer, lambda: state.seek(next(indices)), stop - start)
+    return [gif_frame(frame) if gif else frame for frame in frames]     # The conversion for a GIF is done by the workers too
+
+
+def render_trace(trace, filename, start=1, stop=None, fps=5, rasterised=False, cell=16, title="Ant Foraging Simulation",
+                 workers=1, part=50):
+    """Animate states start .. stop - 1 of a trace (a Trace or the path of one) as a GIF or MP4.
+
+    The default start=1 begins after the first step, like animate_arena. rasterised=True
+    colours the cells without matplotlib (see render.rasterise). With workers > 1 the
+    frames are drawn in parts of part frames by that many worker processes.
+    """
+    from .render import FrameWriter
+    gif = os.path.splitext(filename)[1].lower() == '.gif'
+    if not isinstance(trace, Trace):
+        trace = Trace.load(trace)
+    stop = len(trace) if stop is None else min(stop, len(trace))
+    starts = list(range(start, stop, part))
+    stops = [min(first + part, stop) for first in starts]
+    arguments = (repeat(trace), starts, stops, repeat(rasterised), repeat(cell), repeat(title), repeat(gif))
+    with FrameWriter(filename, fps) as writer:
+        if workers is None or workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for frames in executor.map(_render_part, *arguments):   # Parts come back in order
+                    for frame in frames:
+                        writer.add(frame)
+        else:
+            for frames in map(_render_part, *arguments):
+                for frame in frames:
+                    writer.add(frame)
+
+
+def trace_file(trace_dir, run):
+    # Path of the trace of run (numbered from 0, stored as run_0001.npz = run 1 in the .csv files)
+    return os.path.join(trace_dir, f'run_{run + 1:04d}.npz')
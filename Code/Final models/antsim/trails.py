@@ -0,0 +1,80 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - pheromone trails                                  ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Everything the model needs for pheromones in one component: the pheromone grid (with
+## a border of zeros, see neighbours.py), the diffusion kernel and the evaporation. The
+## arena only creates it when config.pheromones is True. Without it the arena allocates
+## no grid, nothing evaporates per step, and the ants always walk randomly, which is the
+## model of final_no_pheromone.py. The pheromone methods of the arena pass through to it.
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .diffusion import diffusion_kernel
+from .pheromones import make_evaporation
+
+
+class PheromoneTrails:
+    """Pheromone grid of one arena, with its deposition, diffusion and evaporation."""
+
+    def __init__(self, config):
+        self.config = config
+        arena_size = config.arena_size
+        self.padded_grid = np.zeros((arena_size + 2, arena_size + 2))  # Pheromone levels with a border of zeros around the arena, so every position has 8 neighbours
+        self.grid = self.padded_grid[1:-1, 1:-1]                    # Pheromone level of every position in the arena (view on the inside of the padded grid)
+        self.windows = sliding_window_view(self.padded_grid, (3, 3))    # self.windows[x, y] = 3x3 pheromone levels around position (x, y), without copying
+        self.diffusion_kernel = diffusion_kernel(config.diffusion_distance, config.pheromone_min_detectable, config.pheromone_max,
+                                                 config.pheromone_start)   # Precomputed stamp to deposit and diffuse pheromones, shared by all arenas
+        self.evaporation = make_evaporation(config.evaporation_mode, arena_size, config.evaporation_rate, config.pheromone_min_detectable)  # See SimulationConfig.evaporation_mode
+
+    def update(self):
+        # Evaporate by the evaporation rate and remove pheromone below the detection threshold
+        self.evaporation.evaporate(self.grid)
+
+    def value(self, position):
+        x, y = position
+        self.evaporation.refresh_cell(self.grid, x, y)              # Catch up on evaporation first (only needed for the lazy evaporation)
+        return self.grid[x, y]
+
+    def values(self, xs, ys):
+        # Same as value, for arrays of x and y coordinates at once
+        self.evaporation.refresh(self.grid, (xs, ys))
+        return self.grid[xs, ys]
+
+    def neighbourhoods(self, xs, ys):
+        # 3x3 pheromone levels around arrays of positions at once (zero outside the arena)
+        self.evaporation.refresh_windows(self.grid, xs, ys, 1)
+        return self.windows[xs, ys]
+
+    def levels(self):
+        # The whole grid, up to date (e.g. for plotting)
+        self.evaporation.refresh(self.grid, np.s_[:, :])
+        return self.grid
+
+    def add(self, position, value):
+        # Add value to the level of one position, capped at pheromone_max
+        x, y = position
+        self.evaporation.refresh_cell(self.grid, x, y)
+        current_value = self.grid[x, y]
+        if current_value < self.config.pheromone_max:               # Allow deposition only when the current value is under the max
+            self.grid[x, y] = min(current_value + value, self.config.pheromone_max)
+            self.evaporation.mark(position)                         # Let the evaporation know there is pheromone here
+
+    def deposit(self, position, value):
+        # Deposit value at position and let it diffuse to the neighbouring cells
+        x, y = position
+        distance = max(self.diffusion_kernel.depth_limit(value), 0)     # How far this deposit diffuses (at most diffusion_distance)
+        self.evaporation.refresh(self.grid, np.s_[max(x - distance, 0):x + distance + 1,
+                                                  max(y - distance, 0):y + distance + 1])  # Catch up on evaporation where the pheromone can diffuse to
+        self.diffusion_kernel.deposit(self.grid, position, value)
+        self.evaporation.mark(position, distance)                   # Pheromone can have diffused up to distance cells away
+
+    def deposit_trail(self, path, values):
+        # Deposit values[i] at path[i] for a whole path at once, same as deposit for every position in turn
+        positions = np.asarray(path)
+        distance = max(self.diffusion_kernel.depth_limits(np.asarray(values, dtype=float)).max(initial=-1), 0)   # How far the largest deposit diffuses (at most diffusion_distance)
+        self.evaporation.refresh_windows(self.grid, positions[:, 0], positions[:, 1], distance)
+        self.diffusion_kernel.deposit_path(self.grid, positions, values)
+        self.evaporation.mark_path(positions, distance)
@@ -0,0 +1,149 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - ant trajectories on disk                          ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Full trajectories (every ant, every step, every run) are far too large for .csv
+## files. A trajectory file stores them as fixed-width binary records of three int16
+## numbers per ant per step: x, y and the state of the ant (0 = searching for food,
+## 1 = carrying food). The records of one run form one chunk, samples x ants records,
+## appended to the file when the run is finished; a small index file next to it
+## (<file>.idx) gives the run number, the first record, the number of samples and ants
+## and the sampling interval (in steps) of every chunk. TrajectoryFile memory-maps the
+## file, so slicing a run, a range of steps or a few ants only reads those from disk.
+##
+## Only one process writes a trajectory file: with trajectory_file, iter_experiment lets
+## the workers record (TrajectoryRecorder) and send the records back, and writes them in
+## run order. A chunk is written before its index row, so after an interruption the file is
+## cut back to the last complete run when it is opened again.
+
+import os
+
+import numpy as np
+
+from .metrics import Probe, RingBuffer, ant_positions, ants_have_food
+
+
+RECORD = np.dtype([('x', '<i2'), ('y', '<i2'), ('state', '<i2')])  # One ant at one step
+INDEX = np.dtype([('run', '<i8'), ('start', '<i8'), ('samples', '<i8'), ('ants', '<i8'), ('interval', '<i8')])
+MAGIC = b'ANTTRAJ1'                                         # Header of a trajectory file (8 bytes, then the records)
+SEARCHING, CARRYING = 0, 1
+
+
+class TrajectoryRecorder(Probe):
+    """Records the position and state of every ant every interval steps (a probe, see metrics.py)."""
+
+    name = 'trajectory'
+
+    def __init__(self, interval=1, capacity=1024):
+        super().__init__(interval=interval, capacity=capacity, overwrite=False)
+
+    def bind(self, arena, ants):
+        self.arena = arena
+        self.ants = ants
+        self.buffer = RingBuffer(self.capacity, (len(ants_have_food(ants)),), RECORD, overwrite=False)
+        self.record(0)                                      # The start of the run
+
+    def record(self, step):
+        i = self.buffer.slot(step)                          # First: the buffer may grow
+        row = self.buffer.values[i]
+        positions = ant_positions(self.ants)
+        row['x'] = positions[:, 0]
+        row['y'] = positions[:, 1]
+        row['state'] = ants_have_food(self.ants)
+
+    def records(self):
+        # (samples, ants) RECORD array of the run
+        return self.buffer.records()[1]
+
+
+def index_file(path):
+    return path + '.idx'
+
+
+class TrajectoryWriter:
+    """Appends the records of finished runs to a trajectory file and its index."""
+
+    def __init__(self, path, first_run=0):
+        # first_run = 0 starts a new file, otherwise the runs before first_run are kept (and the rest is cut off)
+        self.path = path
+        if first_run and os.path.exists(path) and os.path.exists(index_file(path)):
+            index = _read_index(path)
+            index = index[index['run'] < first_run]
+            end = int((index['start'] + index['samples'] * index['ants']).max()) if len(index) else 0
+            with open(path, 'r+b') as data:
+                data.truncate(len(MAGIC) + end * RECORD.itemsize)
+            with open(index_file(path), 'wb') as file:
+                file.write(index.tobytes())
+        else:
+            with open(path, 'wb') as data:
+                data.write(MAGIC)
+            open(index_file(path), 'wb').close()
+        self._data = open(path, 'ab')
+        self._index = open(index_file(path), 'ab')
+        self.records = (os.path.getsize(path) - len(MAGIC)) // RECORD.itemsize    # Records in the file
+
+    def write(self, run, records, interval=1):
+        records = np.ascontiguousarray(records, dtype=RECORD)
+        self._data.write(records.tobytes())
+        self._data.flush()                                  # The chunk is on disk before its index row
+        row = np.array([(run, self.records, len(records), records.shape[1], interval)], dtype=INDEX)
+        self._index.write(row.tobytes())
+        self._index.flush()
+        self.records += records.size
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_index(path):
+    raw = np.fromfile(index_file(path), dtype=np.uint8)
+    complete = len(raw) - len(raw) % INDEX.itemsize        # Without a row cut off by an interruption
+    return raw[:complete].view(INDEX)
+
+
+class TrajectoryFile:
+    """Read-only, memory-mapped view on a trajectory file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+        self.index = _read_index(path)
+        end = int((self.index['start'] + self.index['samples'] * self.index['ants']).max()) if len(self.index) else 0
+        self.records = np.memmap(path, dtype=RECORD, mode='r', offset=len(MAGIC), shape=(end,)) if end else np.zeros(0, RECORD)
+        self._rows = {int(run): i for i, run in enumerate(self.index['run'])}
+
+    def __len__(self):
+        return len(self.index)                              # Number of runs
+
+    @property
+    def runs(self):
+        return self.index['run']
+
+    def replicate(self, run):
+        # (samples, ants) records of run (a view on the file)
+        row = self.index[self._rows[run]]
+        start, samples = int(row['start']), int(row['samples'])
+        return self.records[start:start + samples * int(row['ants'])].reshape(samples, int(row['ants']))
+
+    def steps(self, run):
+        # Step number of every sample of run
+        row = self.index[self._rows[run]]
+        return np.arange(int(row['samples'])) * int(row['interval'])
+
+    def positions(self, run, samples=slice(None), ants=slice(None)):
+        # (samples, ants, 2) int16 positions of a run, for a range of samples and some ants
+        part = self.replicate(run)[samples, ants]
+        return np.stack([part['x'], part['y']], axis=-1)
+
+    def states(self, run, samples=slice(None), ants=slice(None)):
+        # State of the ants (SEARCHING or CARRYING) for a range of samples
+        return self.replicate(run)[samples, ants]['state']
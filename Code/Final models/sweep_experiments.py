@@ -0,0 +1,56 @@
+#######################################################################################
+## Title: ANT FORAGING BEHAVIOUR - all experiments in one sweep                      ##
+## Course: Project Computational Biology                                             ##
+#######################################################################################
+
+## Runs every experiment of the report (baseline, 50 ants, 50x50 arena and 25x4 food,
+## each with and without pheromones) in one sweep over all cores, and writes the .csv
+## files under the names the R scripts in Code/Statistics read. Finished runs are kept in
+## a checkpoint file, so an interrupted sweep continues where it stopped when the script
+## is started again. Delete the checkpoint file to start over.
+
+## Import packages
+from antsim import SimulationConfig, save_results
+from antsim.sweep import run_sweep
+
+## Define parameters
+runs = 1000                          # Number of replicates per configuration
+workers = None                       # Number of worker processes (None = all cores)
+seed = 2024                          # Master seed, same as in the model scripts
+checkpoint = 'sweep_checkpoint.jsonl'   # File with the finished runs, for resuming
+columnar = False                     # True = also store every food tracking as binary columns (.npz next to the .csv, see antsim.columnar)
+compress_columns = True              # False = store the columns uncompressed (a larger file), so antsim.columnar.load_food_columns memory-maps them
+engine = 'ants'                      # Same default as the model scripts: 'ants' = one Ant object per ant (the original model), 'colony' = all ants at once as arrays (faster)
+
+baseline = SimulationConfig()        # 20x20 arena, 10 ants, 4 food sources of 25
+experiments = {                      # Name of the experiment: changes to the baseline
+    'baseline': {},
+    '50ants': {'ants': 50},
+    '50x50': {'arena_size': 50},
+    '25x4': {'food_sources': 25, 'food_value': 4},      # 25 food sources of 4 food, same total as the baseline
+}
+# Output files per experiment and model (steps per run, food tracking), as read by the R scripts
+file_names = {
+    ('baseline', True): ('ant_with_pheromones.csv', 'food_tracking_pheromones.csv'),
+    ('baseline', False): ('ant_no_pheromones.csv', 'food_tracking_no_pheromones.csv'),
+    ('50ants', True): ('50ants_with_pheromones.csv', 'food_tracking_pheromones_50ants.csv'),
+    ('50ants', False): ('50ants_no_pheromones.csv', 'food_tracking_no_pheromones_50ants.csv'),
+    ('50x50', True): ('50x50_with_pheromones.csv', 'food_tracking_pheromones_50x50.csv'),
+    ('50x50', False): ('50x50_no_pheromones.csv', 'food_tracking_no_pheromones_50x50.csv'),
+    ('25x4', True): ('ant_with_pheromones_25x4.csv', 'food_tracking_with_pheromones_25x4.csv'),
+    ('25x4', False): ('ant_no_pheromones_25x4.csv', 'food_tracking_no_pheromones_25x4.csv'),
+}
+
+####### SWEEP #######
+if __name__ == "__main__":                      # Worker processes import this script, only run the sweep from the main process
+    configs = {}
+    for name, changes in experiments.items():
+        for pheromones in (True, False):
+            configs[(name, pheromones)] = baseline.replace(pheromones=pheromones, engine=engine, **changes)
+
+    results = run_sweep(configs.values(), runs, checkpoint, workers, seed)
+
+    for key, config in configs.items():
+        steps_file, food_file = file_names[key]
+        save_results(results[config], steps_file, food_file, food_file.replace('.csv', '.npz') if columnar else None, compress_columns)
+        print(f"{key[0]:<10} pheromones={key[1]!s:<6} mean steps = {sum(r[0] for r in results[config]) / runs:.1f} -> {steps_file}")